@@ -0,0 +1,335 @@
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('reel_transcriber')
+
+# Status codes worth retrying; anything else in the 4xx range is treated as a permanent failure
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Dispatchers that may retry a spilled result before it is given up for good
+DEFAULT_MAX_REPLAYS = 3
+
+
+class _Delivery:
+    def __init__(self, callback_url: str, payload: Dict, attempts: int = 0, replays: int = 0):
+        self.callback_url = callback_url
+        self.payload = payload
+        # Attempts across every dispatcher that has tried this result; attempts_before are earlier dispatchers'
+        self.attempts = attempts
+        self.attempts_before = attempts
+        self.replays = replays
+        self.permanent = False
+        self.not_before = time.monotonic()
+        self.enqueued_at = time.monotonic()
+        self.last_error: Optional[str] = None
+
+
+class CallbackDispatcher:
+    """
+    Delivers finished results to callback URLs in the background.
+
+    Results are handed off with submit() and sent by a small pool of sender threads that
+    reuse one pooled requests.Session per callback host. Failed deliveries are retried with
+    exponential backoff; results that still cannot be delivered are appended to a local
+    spill file and replayed the next time a dispatcher starts. A result the callback rejected
+    outright (a non-retryable 4xx), or one already replayed max_replays times, is not sent again;
+    replay moves it to a .dead file next to the spill file.
+    """
+
+    def __init__(self,
+                 spill_path: Optional[str] = None,
+                 max_attempts: int = 5,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 60.0,
+                 batch_size: int = 1,
+                 batch_window: float = 0.5,
+                 timeout: float = 10.0,
+                 pool_size: int = 10,
+                 sender_threads: int = 4,
+                 max_replays: int = DEFAULT_MAX_REPLAYS):
+        self.spill_path = spill_path
+        self.max_attempts = max(1, max_attempts)
+        self.max_replays = max_replays
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+        self._pending: Dict[str, List[_Delivery]] = {}
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=sender_threads, thread_name_prefix='callback-sender')
+        self._closed = False
+
+        self._scheduler = threading.Thread(target=self._run, name='callback-dispatcher', daemon=True)
+        self._scheduler.start()
+
+    @classmethod
+    def from_env(cls) -> 'CallbackDispatcher':
+        return cls(
+            spill_path=os.environ.get('CALLBACK_SPILL_PATH', '/tmp/undelivered_callbacks.jsonl'),
+            max_attempts=int(os.environ.get('CALLBACK_MAX_ATTEMPTS', '5')),
+            backoff_base=float(os.environ.get('CALLBACK_BACKOFF_BASE', '1.0')),
+            backoff_max=float(os.environ.get('CALLBACK_BACKOFF_MAX', '60.0')),
+            batch_size=int(os.environ.get('CALLBACK_BATCH_SIZE', '1')),
+            batch_window=float(os.environ.get('CALLBACK_BATCH_WINDOW', '0.5')),
+            timeout=float(os.environ.get('CALLBACK_TIMEOUT', '10')),
+            max_replays=int(os.environ.get('CALLBACK_MAX_REPLAYS', DEFAULT_MAX_REPLAYS)),
+        )
+
+    def submit(self, callback_url: str, payload: Dict) -> None:
+        """Queue a result for delivery and return immediately."""
+        self._enqueue(_Delivery(callback_url, payload))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued result has been delivered or spilled.
+
+        Returns:
+            bool: True if the queue drained before the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining if remaining is not None else 1.0)
+        return True
+
+    def close(self) -> None:
+        """Stop the dispatcher, spilling anything that has not been sent yet."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            leftovers = [d for deliveries in self._pending.values() for d in deliveries]
+            self._pending.clear()
+            self._condition.notify_all()
+
+        for delivery in leftovers:
+            delivery.last_error = delivery.last_error or 'dispatcher closed before delivery'
+            self._spill(delivery)
+
+        self._executor.shutdown(wait=True)
+
+    def replay_spill(self) -> int:
+        """
+        Re-queue results that previous dispatchers failed to deliver.
+
+        Returns:
+            int: Number of results re-queued
+        """
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return 0
+
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, 'r', encoding='utf-8') as spill_file:
+                    lines = spill_file.readlines()
+                os.remove(self.spill_path)
+            except Exception as e:
+                logger.error(f"Could not read callback spill file {self.spill_path}: {str(e)}", exc_info=True)
+                return 0
+
+        replayed = 0
+        dead = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+                replays = record.get('replays', 0)
+                if record.get('permanent') or replays >= self.max_replays:
+                    # Sending it again would fail the same way on every restart
+                    dead.append(line if line.endswith('\n') else line + '\n')
+                    continue
+                self._enqueue(_Delivery(record['callback_url'], record['payload'],
+                                        attempts=record.get('attempts', 0), replays=replays + 1))
+                replayed += 1
+            except Exception as e:
+                logger.warning(f"Skipping unreadable callback spill record: {str(e)}")
+
+        if dead:
+            logger.error(f"Not replaying {len(dead)} rejected or exhausted callback(s); "
+                         f"moved to {self.spill_path}.dead")
+            try:
+                with self._spill_lock:
+                    with open(f"{self.spill_path}.dead", 'a', encoding='utf-8') as dead_file:
+                        dead_file.writelines(dead)
+            except Exception as e:
+                logger.error(f"Could not write {self.spill_path}.dead: {str(e)}", exc_info=True)
+        if replayed:
+            logger.info(f"Re-queued {replayed} undelivered callback(s) from {self.spill_path}")
+        return replayed
+
+    def _enqueue(self, delivery: _Delivery) -> None:
+        with self._condition:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._pending.setdefault(delivery.callback_url, []).append(delivery)
+                self._condition.notify_all()
+
+        if closed:
+            delivery.last_error = 'dispatcher closed'
+            self._spill(delivery)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+
+                now = time.monotonic()
+                batches = []
+                next_wakeup = None
+                for callback_url in list(self._pending):
+                    deliveries = self._pending[callback_url]
+                    ready = [d for d in deliveries if d.not_before <= now]
+
+                    # Wait briefly for more results to the same URL when batching is enabled
+                    oldest = min((d.enqueued_at for d in ready), default=None)
+                    if ready and (len(ready) >= self.batch_size or now - oldest >= self.batch_window):
+                        batch = ready[:self.batch_size]
+                        for d in batch:
+                            deliveries.remove(d)
+                        if not deliveries:
+                            del self._pending[callback_url]
+                        batches.append((callback_url, batch))
+                        self._in_flight += len(batch)
+                        continue
+
+                    for d in deliveries:
+                        wake = d.not_before if d.not_before > now else oldest + self.batch_window
+                        next_wakeup = wake if next_wakeup is None else min(next_wakeup, wake)
+
+                if not batches:
+                    timeout = None if next_wakeup is None else max(0.01, next_wakeup - now)
+                    self._condition.wait(timeout)
+                    continue
+
+            for callback_url, batch in batches:
+                try:
+                    self._executor.submit(self._send, callback_url, batch)
+                except RuntimeError:
+                    # The executor was shut down between scheduling and sending
+                    for delivery in batch:
+                        delivery.last_error = 'dispatcher closed before delivery'
+                        self._spill(delivery)
+                    with self._condition:
+                        self._in_flight -= len(batch)
+                        self._condition.notify_all()
+
+    def _session_for(self, callback_url: str) -> requests.Session:
+        host = urlsplit(callback_url).netloc
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({'Content-Type': 'application/json'})
+                self._sessions[host] = session
+            return session
+
+    def _send(self, callback_url: str, batch: List[_Delivery]) -> None:
+        try:
+            # A single result keeps the original callback body; batches wrap the bodies in a list
+            body = batch[0].payload if len(batch) == 1 else {'results': [d.payload for d in batch]}
+            logger.info(f"Sending {len(batch)} callback result(s) to: {callback_url}")
+
+            error = None
+            retryable = True
+            try:
+                response = self._session_for(callback_url).post(callback_url, json=body, timeout=self.timeout)
+                logger.info(f"Callback response status: {response.status_code}")
+                if response.ok:
+                    return
+                error = f"HTTP {response.status_code}: {response.text[:500]}"
+                retryable = response.status_code in RETRYABLE_STATUS_CODES
+            except requests.RequestException as e:
+                error = str(e)
+
+            logger.warning(f"Callback to {callback_url} failed: {error}")
+            for delivery in batch:
+                delivery.attempts += 1
+                delivery.last_error = error
+                delivery.permanent = not retryable
+                tried = delivery.attempts - delivery.attempts_before
+                if retryable and tried < self.max_attempts:
+                    delay = min(self.backoff_max, self.backoff_base * (2 ** (tried - 1)))
+                    delivery.not_before = time.monotonic() + delay * random.uniform(0.5, 1.0)
+                    self._enqueue(delivery)
+                else:
+                    self._spill(delivery)
+        except Exception as e:
+            logger.error(f"Unexpected error while sending callback: {str(e)}", exc_info=True)
+            for delivery in batch:
+                delivery.last_error = str(e)
+                self._spill(delivery)
+        finally:
+            with self._condition:
+                self._in_flight -= len(batch)
+                self._condition.notify_all()
+
+    def _spill(self, delivery: _Delivery) -> None:
+        logger.error(f"Giving up on callback to {delivery.callback_url} after {delivery.attempts} attempt(s): "
+                     f"{delivery.last_error}")
+        if not self.spill_path:
+            return
+
+        record = {
+            'callback_url': delivery.callback_url,
+            'payload': delivery.payload,
+            'attempts': delivery.attempts,
+            'replays': delivery.replays,
+            'permanent': delivery.permanent,
+            'error': delivery.last_error,
+            'spilled_at': datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            with self._spill_lock:
+                with open(self.spill_path, 'a', encoding='utf-8') as spill_file:
+                    spill_file.write(json.dumps(record) + '\n')
+        except Exception as e:
+            logger.error(f"Could not write callback spill file {self.spill_path}: {str(e)}", exc_info=True)
+
+
+_dispatcher: Optional[CallbackDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> CallbackDispatcher:
+    """Return the process-wide dispatcher, creating it (and replaying spilled results) on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = CallbackDispatcher.from_env()
+            atexit.register(_dispatcher.close)
+            _dispatcher.replay_spill()
+        return _dispatcher
+
+
+def replay_spilled_callbacks() -> None:
+    """Start the dispatcher at instance startup if earlier results are waiting in the spill file."""
+    spill_path = os.environ.get('CALLBACK_SPILL_PATH', '/tmp/undelivered_callbacks.jsonl')
+    if spill_path and os.path.exists(spill_path) and os.path.getsize(spill_path) > 0:
+        get_dispatcher()
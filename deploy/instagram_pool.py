@@ -0,0 +1,275 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger('reel_transcriber')
+
+T = TypeVar('T')
+
+# Multiplicative decrease on throttling, additive increase on success (per account)
+SLOWDOWN_FACTOR = 0.5
+MIN_RATE_FRACTION = 0.1
+RECOVERY_STEP = 0.05
+
+# The 'message' Instagram's JSON API returns when it blocks or challenges an account. yt-dlp's text for
+# private or deleted posts ("rate-limit reached or login required") is not among them on purpose.
+CHALLENGE_MESSAGES = ('checkpoint_required', 'challenge_required', 'feedback_required')
+
+
+class InstagramThrottled(Exception):
+    """Instagram answered with a 429, a login challenge or a similar block for one account."""
+
+
+class InstagramUnavailable(Exception):
+    """No account could make a request within the acquire timeout."""
+
+
+def is_challenge_payload(payload) -> bool:
+    """Whether a parsed Instagram JSON response is a checkpoint, challenge or feedback block."""
+    return isinstance(payload, dict) and payload.get('message') in CHALLENGE_MESSAGES
+
+
+def http_status(error: BaseException) -> Optional[int]:
+    """The HTTP status behind an exception, following yt-dlp's wrapped causes, or None."""
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        response = getattr(current, 'response', None)
+        for status in (getattr(current, 'status', None), getattr(current, 'code', None),
+                       getattr(response, 'status_code', None), getattr(response, 'status', None)):
+            if isinstance(status, int):
+                return status
+        exc_info = getattr(current, 'exc_info', None)
+        if isinstance(exc_info, tuple) and len(exc_info) > 1:
+            pending.append(exc_info[1])
+        pending.extend([getattr(current, 'cause', None), current.__cause__, current.__context__])
+    return None
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """
+    Whether a failed request was throttled: an actual HTTP 429 somewhere in the error's causes.
+
+    The message text is not searched, since it quotes reel IDs and yt-dlp's generic errors for
+    unavailable posts; treating those as throttling would bench healthy accounts.
+    """
+    return http_status(error) == 429
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations.
+
+    A reservation always takes a token, letting the balance go negative, and tells the caller
+    how long to wait for it; later callers queue behind earlier ones. Not thread-safe on its own.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+    def reserve(self, now: float) -> float:
+        wait = self.wait_time(now)
+        self.tokens -= 1.0
+        return wait
+
+    def refund(self) -> None:
+        self.tokens = min(self.burst, self.tokens + 1.0)
+
+    def slow_down(self, now: float) -> None:
+        self._refill(now)
+        self.rate = max(self.base_rate * MIN_RATE_FRACTION, self.rate * SLOWDOWN_FACTOR)
+        # Drop any saved-up burst so the slower rate takes effect immediately
+        self.tokens = min(self.tokens, 0.0)
+
+    def recover(self, now: float) -> None:
+        self._refill(now)
+        self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+
+
+class InstagramAccount:
+    """One set of credentials with its own rate limit, health and cached session cookies."""
+
+    def __init__(self, username: Optional[str], password: Optional[str], bucket: TokenBucket):
+        self.username = username
+        self.password = password
+        self.bucket = bucket
+        self.cookies: Optional[Dict] = None
+        self.logged_in_at = 0.0
+        self.cooldown_until = 0.0
+        self.throttled_at = 0.0
+        self.failures = 0
+        self.last_used = 0.0
+        self.login_lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        return self.username or 'anonymous'
+
+
+class InstagramSessionPool:
+    """
+    Spreads Instagram requests over the configured accounts.
+
+    Every request reserves a token from the least-loaded healthy account's bucket and waits for it.
+    A 429 or login challenge halves that account's rate, drops its session and takes it out of
+    rotation for a cooldown that doubles with each consecutive failure. Successes restore the rate
+    gradually. Sustained throughput is roughly rate_per_minute times the number of healthy accounts.
+    """
+
+    def __init__(self, accounts: List[Dict], rate_per_minute: float = 20.0, burst: float = 5.0,
+                 cooldown_seconds: float = 900.0, session_ttl_seconds: float = 3600.0,
+                 acquire_timeout: float = 60.0):
+        if not accounts:
+            # Without credentials requests still go out anonymously, paced like one account
+            accounts = [{'username': None, 'password': None}]
+        self.accounts = [
+            InstagramAccount(account.get('username'), account.get('password'),
+                             TokenBucket(rate_per_minute / 60.0, burst))
+            for account in accounts
+        ]
+        self.cooldown_seconds = cooldown_seconds
+        self.session_ttl_seconds = session_ttl_seconds
+        self.acquire_timeout = acquire_timeout
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'InstagramSessionPool':
+        """
+        Accounts from INSTAGRAM_ACCOUNTS (a JSON list of {"username", "password"} objects), or the
+        single INSTAGRAM_USERNAME / INSTAGRAM_PASSWORD pair.
+        """
+        accounts = []
+        raw_accounts = os.environ.get('INSTAGRAM_ACCOUNTS')
+        if raw_accounts:
+            try:
+                accounts = [account for account in json.loads(raw_accounts) if account.get('username')]
+            except (ValueError, AttributeError) as e:
+                logger.error(f"Ignoring invalid INSTAGRAM_ACCOUNTS: {str(e)}")
+        if not accounts and os.environ.get('INSTAGRAM_USERNAME'):
+            accounts = [{
+                'username': os.environ.get('INSTAGRAM_USERNAME'),
+                'password': os.environ.get('INSTAGRAM_PASSWORD')
+            }]
+        return cls(
+            accounts,
+            rate_per_minute=float(os.environ.get('INSTAGRAM_RATE_PER_MINUTE', 20)),
+            burst=float(os.environ.get('INSTAGRAM_BURST', 5)),
+            cooldown_seconds=float(os.environ.get('INSTAGRAM_COOLDOWN_SECONDS', 900)),
+            session_ttl_seconds=float(os.environ.get('INSTAGRAM_SESSION_TTL_SECONDS', 3600)),
+            acquire_timeout=float(os.environ.get('INSTAGRAM_ACQUIRE_TIMEOUT', 60))
+        )
+
+    def acquire(self, account: Optional[InstagramAccount] = None) -> InstagramAccount:
+        """
+        Wait for permission to send one request, on the given account or the best available one.
+
+        Raises:
+            InstagramUnavailable: If the chosen account's rate limit leaves no slot within acquire_timeout
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                pool = [account] if account is not None else self.accounts
+                candidates = [candidate for candidate in pool if candidate.cooldown_until <= now]
+                if not candidates:
+                    ready_at = min(candidate.cooldown_until for candidate in pool)
+                    if ready_at > deadline:
+                        # Failing every request for a whole cooldown is worse than risking another throttle;
+                        # the account's halved rate still paces it
+                        candidates = [min(pool, key=lambda candidate: candidate.throttled_at)]
+                        logger.warning(f"All Instagram accounts are cooling down; trying account "
+                                       f"{candidates[0].label}, throttled longest ago")
+                if candidates:
+                    chosen = min(candidates, key=lambda candidate: (candidate.bucket.wait_time(now),
+                                                                    candidate.last_used))
+                    wait = chosen.bucket.reserve(now)
+                    if now + wait > deadline:
+                        chosen.bucket.refund()
+                        raise InstagramUnavailable(
+                            f"Instagram rate limit: no request slot within {self.acquire_timeout:.0f}s"
+                        )
+                    chosen.last_used = now + wait
+
+            if candidates:
+                if wait > 0:
+                    time.sleep(wait)
+                return chosen
+            time.sleep(max(0.0, ready_at - time.monotonic()))
+
+    def report_success(self, account: InstagramAccount) -> None:
+        with self._lock:
+            now = time.monotonic()
+            account.failures = 0
+            # A request that got through ends the cooldown early
+            account.cooldown_until = min(account.cooldown_until, now)
+            account.bucket.recover(now)
+
+    def report_throttled(self, account: InstagramAccount, reason: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            account.failures += 1
+            cooldown = self.cooldown_seconds * 2 ** min(account.failures - 1, 4)
+            account.cooldown_until = now + cooldown
+            account.throttled_at = now
+            account.bucket.slow_down(now)
+            # A challenged session is useless; log in again after the cooldown
+            account.cookies = None
+        logger.warning(f"Instagram throttled account {account.label} ({reason}); "
+                       f"cooling down for {cooldown:.0f}s at {account.bucket.rate * 60:.1f} requests/min")
+
+    def cached_cookies(self, account: InstagramAccount) -> Optional[Dict]:
+        with self._lock:
+            if account.cookies is not None and time.monotonic() - account.logged_in_at < self.session_ttl_seconds:
+                return account.cookies
+            return None
+
+    def store_cookies(self, account: InstagramAccount, cookies: Dict) -> None:
+        with self._lock:
+            account.cookies = cookies
+            account.logged_in_at = time.monotonic()
+
+    def call(self, operation: Callable[[InstagramAccount], T]) -> T:
+        """
+        Run an Instagram request on a pooled account, moving to another account when one is throttled.
+
+        Raises:
+            InstagramUnavailable: If every attempt was throttled or no account became available
+        """
+        last_error: Optional[Exception] = None
+        for _ in range(len(self.accounts)):
+            account = self.acquire()
+            try:
+                result = operation(account)
+            except InstagramThrottled as e:
+                self.report_throttled(account, str(e))
+                last_error = e
+                continue
+            except Exception as e:
+                if not is_throttle_error(e):
+                    raise
+                self.report_throttled(account, str(e))
+                last_error = e
+                continue
+            self.report_success(account)
+            return result
+        raise InstagramUnavailable(f"Instagram throttled every account tried: {str(last_error)}")
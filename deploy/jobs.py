@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from reel_listing import REEL_ID_PATTERN
+
+logger = logging.getLogger('reel_transcriber')
+
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+def canonical_reel_key(url: str) -> str:
+    """
+    Reduce the many URL spellings of a reel to one key.
+
+    /reel/ID/, /reels/ID/, /p/ID/ and /username/reel/ID/?igsh=... all map to 'instagram:ID';
+    other URLs fall back to the URL without query string or fragment.
+    """
+    match = REEL_ID_PATTERN.search(url)
+    if match:
+        return f"instagram:{match.group(1)}"
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), '', ''))
+
+
+class JobStore:
+    """In-memory job store. Finished jobs are kept for ttl_seconds so clients can poll for them."""
+
+    def __init__(self, ttl_seconds: float = 3600):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create(self, key: str) -> Dict:
+        now = time.time()
+        job = {
+            'jobId': uuid.uuid4().hex,
+            'key': key,
+            'status': JOB_QUEUED,
+            'createdAt': now,
+            'updatedAt': now,
+            'result': None,
+            'error': None
+        }
+        with self._lock:
+            self._prune(now)
+            self._jobs[job['jobId']] = job
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields)
+                job['updatedAt'] = time.time()
+
+    def _prune(self, now: float) -> None:
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in (JOB_DONE, JOB_FAILED) and now - job['updatedAt'] > self.ttl_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class SQLiteJobStore(JobStore):
+    """Job store backed by a SQLite file, so job state survives restarts and can be shared by processes."""
+
+    def __init__(self, path: str, ttl_seconds: float = 3600):
+        super().__init__(ttl_seconds)
+        self.path = path
+        # sqlite3's connection context manager only commits; closing() releases the file handle too
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    result TEXT,
+                    error TEXT
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create(self, key: str) -> Dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (JOB_DONE, JOB_FAILED, now - self.ttl_seconds)
+            )
+            conn.execute(
+                "INSERT INTO jobs (job_id, key, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, key, JOB_QUEUED, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock, closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT job_id, key, status, created_at, updated_at, result, error FROM jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'jobId': row[0],
+            'key': row[1],
+            'status': row[2],
+            'createdAt': row[3],
+            'updatedAt': row[4],
+            'result': json.loads(row[5]) if row[5] else None,
+            'error': row[6]
+        }
+
+    def update(self, job_id: str, **fields) -> None:
+        columns = {'status': 'status', 'result': 'result', 'error': 'error'}
+        assignments = ['updated_at = ?']
+        values = [time.time()]
+        for name, value in fields.items():
+            if name not in columns:
+                continue
+            assignments.append(f"{columns[name]} = ?")
+            values.append(json.dumps(value) if name == 'result' and value is not None else value)
+        values.append(job_id)
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE job_id = ?", values)
+
+
+def create_job_store() -> JobStore:
+    """Use SQLite when JOB_STORE_PATH is set, otherwise keep jobs in memory."""
+    ttl_seconds = float(os.environ.get('JOB_TTL_SECONDS', '3600'))
+    path = os.environ.get('JOB_STORE_PATH')
+    if path:
+        logger.info(f"Using SQLite job store at {path}")
+        return SQLiteJobStore(path, ttl_seconds)
+    return JobStore(ttl_seconds)
+
+
+# Called with (job, result, error) once the shared pipeline run finishes
+Subscriber = Callable[[Dict, Optional[Dict], Optional[str]], None]
+
+
+class _Flight:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.subscribers: List[Subscriber] = []
+        self.done = threading.Event()
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+
+
+class JobCoordinator:
+    """
+    Runs transcription jobs and merges identical in-flight requests.
+
+    Requests with the same key while a run is in flight join that run instead of starting
+    their own download and transcription; every subscriber is notified with the shared result.
+    """
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self._flights: Dict[str, _Flight] = {}
+        self._by_job: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, run: Callable[[], Dict], subscriber: Optional[Subscriber] = None) -> Tuple[Dict, bool]:
+        """
+        Start a job for key, or join the run already in flight for it.
+
+        Returns:
+            Tuple[Dict, bool]: The job record and whether this call joined an existing run
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if not joined:
+                job = self.store.create(key)
+                flight = _Flight(job['jobId'])
+                self._flights[key] = flight
+                self._by_job[flight.job_id] = flight
+            if subscriber:
+                flight.subscribers.append(subscriber)
+
+        if joined:
+            logger.info(f"Joined in-flight job {flight.job_id} for {key}")
+        else:
+            threading.Thread(target=self._execute, args=(key, flight, run), daemon=True).start()
+
+        return self.store.get(flight.job_id), joined
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until an in-flight job finishes and return its record."""
+        with self._lock:
+            flight = self._by_job.get(job_id)
+        if flight:
+            flight.done.wait(timeout)
+        return self.store.get(job_id)
+
+    def _execute(self, key: str, flight: _Flight, run: Callable[[], Dict]) -> None:
+        self.store.update(flight.job_id, status=JOB_RUNNING)
+        try:
+            flight.result = run()
+            self.store.update(flight.job_id, status=JOB_DONE, result=flight.result)
+        except Exception as e:
+            logger.error(f"Job {flight.job_id} failed: {str(e)}", exc_info=True)
+            flight.error = str(e)
+            self.store.update(flight.job_id, status=JOB_FAILED, error=flight.error)
+        finally:
+            # Stop accepting new subscribers before notifying the ones already attached
+            with self._lock:
+                self._flights.pop(key, None)
+                self._by_job.pop(flight.job_id, None)
+                subscribers = list(flight.subscribers)
+            flight.done.set()
+
+        job = self.store.get(flight.job_id)
+        for subscriber in subscribers:
+            try:
+                subscriber(job, dict(flight.result) if flight.result else None, flight.error)
+            except Exception as e:
+                logger.error(f"Error notifying subscriber of job {flight.job_id}: {str(e)}", exc_info=True)
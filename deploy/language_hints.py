@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('reel_transcriber')
+
+# Whisper's own fallback threshold: decodes averaging below this log-probability are treated as failed
+LOW_CONFIDENCE_LOGPROB = -1.0
+
+# The Whisper API's verbose_json response names the language ("english"); hints are kept as ISO codes
+WHISPER_LANGUAGE_CODES = {
+    'english': 'en', 'spanish': 'es', 'portuguese': 'pt', 'french': 'fr', 'german': 'de',
+    'italian': 'it', 'dutch': 'nl', 'russian': 'ru', 'ukrainian': 'uk', 'polish': 'pl',
+    'turkish': 'tr', 'arabic': 'ar', 'hindi': 'hi', 'indonesian': 'id', 'japanese': 'ja',
+    'korean': 'ko', 'chinese': 'zh', 'vietnamese': 'vi', 'thai': 'th', 'swedish': 'sv',
+    'tagalog': 'tl', 'greek': 'el', 'hebrew': 'he', 'romanian': 'ro', 'czech': 'cs'
+}
+
+# Google Speech-to-Text v1 wants a BCP-47 locale; map ISO codes to the most common one
+GOOGLE_LANGUAGE_CODES = {
+    'en': 'en-US', 'es': 'es-ES', 'pt': 'pt-BR', 'fr': 'fr-FR', 'de': 'de-DE', 'it': 'it-IT',
+    'nl': 'nl-NL', 'ru': 'ru-RU', 'uk': 'uk-UA', 'pl': 'pl-PL', 'tr': 'tr-TR', 'ar': 'ar-SA',
+    'hi': 'hi-IN', 'id': 'id-ID', 'ja': 'ja-JP', 'ko': 'ko-KR', 'zh': 'cmn-Hans-CN', 'vi': 'vi-VN',
+    'th': 'th-TH', 'sv': 'sv-SE', 'tl': 'fil-PH', 'el': 'el-GR', 'he': 'iw-IL', 'ro': 'ro-RO',
+    'cs': 'cs-CZ'
+}
+
+
+# Languages Google Speech-to-Text also listens for when the spoken language is not given (it allows 3)
+GOOGLE_ALTERNATIVE_LANGUAGES = [
+    code.strip() for code in os.environ.get('GOOGLE_ALTERNATIVE_LANGUAGES', 'es,pt,fr').split(',') if code.strip()
+]
+
+# Google's confidence (0-1) a transcript must reach before the language it was recognised in is remembered
+GOOGLE_MIN_CONFIDENCE = 0.6
+
+# Google reports a few languages under older or macro-language tags
+GOOGLE_LANGUAGE_ALIASES = {'cmn': 'zh', 'yue': 'zh', 'iw': 'he', 'fil': 'tl'}
+
+
+def creator_key(info: Dict) -> Optional[str]:
+    """Stable identifier for the account that posted a video, from yt-dlp info."""
+    for field in ('channel_id', 'uploader_id', 'channel', 'uploader'):
+        if info.get(field):
+            return f"{info.get('extractor_key', 'generic').lower()}:{info[field]}"
+    return None
+
+
+def whisper_language_code(language: Optional[str]) -> Optional[str]:
+    """Normalize a Whisper API language name or code to an ISO 639-1 code."""
+    if not language:
+        return None
+    language = language.lower()
+    return language if len(language) <= 3 else WHISPER_LANGUAGE_CODES.get(language)
+
+
+def google_language_code(language: Optional[str]) -> str:
+    """BCP-47 locale for Google Speech-to-Text, defaulting to en-US."""
+    if not language:
+        return 'en-US'
+    return language if '-' in language else GOOGLE_LANGUAGE_CODES.get(language.lower(), language)
+
+
+def google_alternative_codes(language: Optional[str]) -> List[str]:
+    """Locales for Google's alternative_language_codes: the configured languages other than the primary one."""
+    primary = google_language_code(language).lower()
+    codes = [google_language_code(code) for code in GOOGLE_ALTERNATIVE_LANGUAGES]
+    return [code for code in codes if code.lower() != primary][:3]
+
+
+def language_from_google_code(code: Optional[str]) -> Optional[str]:
+    """ISO 639-1 code for the locale Google reports on a result (\"es-es\", \"cmn-hans-cn\")."""
+    if not code:
+        return None
+    base = code.lower().split('-')[0]
+    return GOOGLE_LANGUAGE_ALIASES.get(base, base)
+
+
+def average_logprob(segments: List[Dict]) -> Optional[float]:
+    """Duration-weighted average log-probability of decoded segments."""
+    total_duration = sum(max(segment['end'] - segment['start'], 0.01) for segment in segments)
+    if not total_duration:
+        return None
+    return sum(
+        segment['avg_logprob'] * max(segment['end'] - segment['start'], 0.01) for segment in segments
+    ) / total_duration
+
+
+class LanguageHints:
+    """
+    Remembers the language each creator posts in.
+
+    Kept in memory for the life of the instance, and in a JSON file when LANGUAGE_HINTS_PATH is set.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.languages: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as hints_file:
+                    self.languages = json.load(hints_file)
+            except Exception as e:
+                logger.warning(f"Could not read language hints from {path}: {str(e)}")
+
+    @classmethod
+    def from_env(cls) -> 'LanguageHints':
+        return cls(os.environ.get('LANGUAGE_HINTS_PATH'))
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if not key:
+            return None
+        with self._lock:
+            return self.languages.get(key)
+
+    def record(self, key: Optional[str], language: Optional[str]) -> None:
+        if not key or not language:
+            return
+        with self._lock:
+            if self.languages.get(key) == language:
+                return
+            logger.info(f"Remembering language {language} for {key}")
+            self.languages[key] = language
+            if self.path:
+                try:
+                    temp_path = f"{self.path}.tmp"
+                    with open(temp_path, 'w', encoding='utf-8') as hints_file:
+                        json.dump(self.languages, hints_file)
+                    os.replace(temp_path, self.path)
+                except Exception as e:
+                    logger.warning(f"Could not write language hints to {self.path}: {str(e)}")
@@ -5,16 +5,36 @@ import requests
 import os
 import json
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Set, Tuple
 import logging
 import sys
 from google.cloud import speech_v1
 from google.cloud import storage
+from google.auth.credentials import AnonymousCredentials
 import uuid
 import time
 from openai import OpenAI
 
+from dispatcher import get_dispatcher, replay_spilled_callbacks
+from streaming import (
+    GCS_UPLOAD_CHUNK_SIZE, GOOGLE_TRANSCODE_ARGS, WHISPER_TRANSCODE_ARGS, AudioSourceUnavailable, AudioStreamError,
+    AudioTranscodeStream, MemoryLimitExceeded, fetch_media, peak_rss_bytes, select_audio_format,
+    stream_to_openai_transcription, upload_stream_to_gcs
+)
+from language_hints import (
+    GOOGLE_MIN_CONFIDENCE, LOW_CONFIDENCE_LOGPROB, LanguageHints, average_logprob, creator_key,
+    google_alternative_codes, google_language_code, language_from_google_code, whisper_language_code
+)
+from instagram_pool import InstagramAccount, InstagramSessionPool, InstagramThrottled, is_challenge_payload
+from packing import (
+    PACK_MAX_CLIP_SECONDS, PACK_MAX_SECONDS, PACK_PEAK_BYTES_PER_SECOND, PCM_TRANSCODE_ARGS, encode_pcm, packed_pcm,
+    plan_packs, split_segments, split_words
+)
+from reel_listing import FLAT_LISTING_OPTIONS, SYNC_DEFAULT_LIMIT, listed_reels, pending_reels
+from jobs import JOB_DONE, JOB_FAILED, JobCoordinator, canonical_reel_key, create_job_store
+
 # Configure structured logging
 class StructuredFormatter(logging.Formatter):
     def format(self, record):
@@ -63,19 +83,90 @@ class YDLLogger:
         logger.error(msg)
 
 
+def whisper_transcription(payload: Dict) -> Dict:
+    """Reduce a verbose_json Whisper API response to text, language code and segments."""
+    return {
+        'text': payload.get('text', ''),
+        'language': whisper_language_code(payload.get('language')),
+        'segments': [
+            {'start': segment['start'], 'end': segment['end'], 'avg_logprob': segment['avg_logprob'],
+             'text': segment.get('text', '')}
+            for segment in payload.get('segments') or []
+            if segment.get('avg_logprob') is not None
+        ]
+    }
+
+
+def google_transcription(response, language: Optional[str] = None) -> Dict:
+    """
+    Reduce a Speech-to-Text response to text, the language it was recognised in and its confidence.
+
+    The language is the one covering most of the transcript (results carry their own language_code
+    when alternative languages were requested); the requested language when none is reported.
+    """
+    alternatives = [(result.language_code, result.alternatives[0]) for result in response.results if result.alternatives]
+    text_by_language: Dict[str, int] = {}
+    for code, alternative in alternatives:
+        detected = language_from_google_code(code)
+        if detected:
+            text_by_language[detected] = text_by_language.get(detected, 0) + len(alternative.transcript)
+    # Google leaves confidence at 0 when it has none to report
+    scored = [(alternative.confidence, len(alternative.transcript)) for _, alternative in alternatives
+              if alternative.confidence]
+    scored_length = sum(length for _, length in scored)
+    return {
+        'text': " ".join(alternative.transcript for _, alternative in alternatives),
+        'language': max(text_by_language, key=text_by_language.get) if text_by_language else language,
+        'segments': [],
+        'confidence': sum(confidence * length for confidence, length in scored) / scored_length if scored_length else None
+    }
+
+
+# External endpoints, overridable so the function can run against local fakes (see scripts/loadtest)
+INSTAGRAM_BASE_URL = os.environ.get('INSTAGRAM_BASE_URL', 'https://www.instagram.com').rstrip('/')
+READWISE_BASE_URL = os.environ.get('READWISE_BASE_URL', 'https://readwise.io/api/v2').rstrip('/')
+
+# Per-creator languages learned by this instance, shared by all transcriber instances
+language_hints = LanguageHints.from_env()
+
+# Instagram rate limits are per account, so every transcriber instance must share one pool
+instagram_pool = InstagramSessionPool.from_env()
+
+# Results an earlier process on this instance could not deliver go out now, not with the next callback
+replay_spilled_callbacks()
+
+
 class InstagramTranscriber:
     def __init__(self):
         # Google Speech-to-Text clients
-        self.speech_client = speech_v1.SpeechClient()
+        speech_endpoint = os.environ.get('SPEECH_API_ENDPOINT')
+        if speech_endpoint:
+            # Alternative endpoint over REST without Google credentials
+            self.speech_client = speech_v1.SpeechClient(
+                credentials=AnonymousCredentials(),
+                transport='rest',
+                client_options={'api_endpoint': speech_endpoint}
+            )
+        else:
+            self.speech_client = speech_v1.SpeechClient()
         self.storage_client = storage.Client()
         self.bucket_name = os.environ.get('GCP_STORAGE_BUCKET')
 
         # OpenAI client (initialize only if API key is present)
         self.openai_client = OpenAI() if os.environ.get('OPENAI_API_KEY') else None
 
-        # Instagram credentials
-        self.instagram_username = os.environ.get('INSTAGRAM_USERNAME')
-        self.instagram_password = os.environ.get('INSTAGRAM_PASSWORD')
+        # Instagram accounts, paced and rotated by the shared pool
+        self.instagram_pool = instagram_pool
+
+        self.language_hints = language_hints
+
+        # Stream audio from the CDN through ffmpeg to the backend instead of staging files in /tmp
+        self.stream_audio = os.environ.get('STREAM_AUDIO', 'true').lower() not in ('0', 'false', 'no')
+        max_job_rss_mb = os.environ.get('MAX_JOB_RSS_MB')
+        self.max_job_rss_bytes = int(max_job_rss_mb) * 1024 * 1024 if max_job_rss_mb else None
+
+        # Bulk requests send short clips to the backend several at a time
+        self.pack_clips = os.environ.get('PACK_CLIPS', 'true').lower() not in ('0', 'false', 'no')
 
     def normalize_instagram_url(self, url: str) -> str:
         """Convert various Instagram URL formats to the standard format."""
@@ -89,54 +180,80 @@ class InstagramTranscriber:
         logger.info(f"Normalized URL: {url}")
 
         try:
-            logger.info("Attempting to get Instagram cookies")
-            cookies = self.get_instagram_cookies()
-            logger.info(f"Retrieved cookies with keys: {list(cookies.keys())}")
-
-            ydl_opts = {
-                'skip_download': True,
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': True,
-                'encoding': None,
-                'logger': YDLLogger(),
-                'cookiefile': None,
-                'cookiesfrombrowser': None,
-                'cookies': cookies  # Use the cookies directly
-            }
-            
-            logger.info("Starting yt-dlp extraction for video info")
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                logger.info(f"Extracting info for URL: {url}")
-                info = ydl.extract_info(url, download=False)
-                logger.info("Successfully extracted video info")
-                
-                # Ensure all string values are properly decoded
-                if isinstance(info.get('description'), bytes):
-                    info['description'] = info['description'].decode('utf-8')
-                if isinstance(info.get('uploader'), bytes):
-                    info['uploader'] = info['uploader'].decode('utf-8')
-                if isinstance(info.get('channel'), bytes):
-                    info['channel'] = info['channel'].decode('utf-8')
-                    
-                # Log key video attributes for debugging
-                logger.info(f"Video info retrieved - title: {info.get('title', 'N/A')[:30]}..., "
-                           f"uploader: {info.get('uploader', 'N/A')}, "
-                           f"duration: {info.get('duration', 'N/A')}")
-                           
-            return info
-            
+            return self.instagram_pool.call(lambda account: self.extract_video_info(url, account))
         except Exception as e:
             error_msg = f"Error in get_video_info for URL {url}: {str(e)}"
             logger.error(error_msg, exc_info=True)
             raise
 
+    def extract_video_info(self, url: str, account: InstagramAccount) -> Dict:
+        logger.info(f"Attempting to get Instagram cookies for account {account.label}")
+        cookies = self.get_instagram_cookies(account)
+        logger.info(f"Retrieved cookies with keys: {list(cookies.keys())}")
+
+        ydl_opts = {
+            'skip_download': True,
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': True,
+            'encoding': None,
+            'logger': YDLLogger(),
+            'cookiefile': None,
+            'cookiesfrombrowser': None,
+            'cookies': cookies  # Use the cookies directly
+        }
+
+        logger.info("Starting yt-dlp extraction for video info")
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            logger.info(f"Extracting info for URL: {url}")
+            info = ydl.extract_info(url, download=False)
+            logger.info("Successfully extracted video info")
+
+            # Ensure all string values are properly decoded
+            if isinstance(info.get('description'), bytes):
+                info['description'] = info['description'].decode('utf-8')
+            if isinstance(info.get('uploader'), bytes):
+                info['uploader'] = info['uploader'].decode('utf-8')
+            if isinstance(info.get('channel'), bytes):
+                info['channel'] = info['channel'].decode('utf-8')
+
+            # Log key video attributes for debugging
+            logger.info(f"Video info retrieved - title: {info.get('title', 'N/A')[:30]}..., "
+                       f"uploader: {info.get('uploader', 'N/A')}, "
+                       f"duration: {info.get('duration', 'N/A')}")
+
+        return info
+
+    def list_new_reels(self, url: str, known_ids: List[str], limit: Optional[int] = None,
+                       stop_after_known: Optional[int] = None) -> List[Dict]:
+        """The reels of a profile or saved collection that are not in known_ids, newest first."""
+        return self.instagram_pool.call(
+            lambda account: self.list_with_account(url, known_ids, limit, stop_after_known, account)
+        )
+
+    def list_with_account(self, url: str, known_ids: List[str], limit: Optional[int],
+                          stop_after_known: Optional[int], account: InstagramAccount) -> List[Dict]:
+        cookies = self.get_instagram_cookies(account)
+        ydl_opts = {**FLAT_LISTING_OPTIONS, 'logger': YDLLogger(), 'cookies': cookies}
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Flat, lazy extraction: listing stops fetching pages once enough new reels are found
+            listing = ydl.extract_info(url, download=False, process=False)
+            return list(pending_reels(
+                listed_reels(listing), set(known_ids), SYNC_DEFAULT_LIMIT if limit is None else limit, stop_after_known
+            ))
+
     def download_video(self, url: str, output_path: str) -> None:
         url = self.normalize_instagram_url(url)
         logger.info(f"Starting download with output path: {output_path} for URL: {url}")
+        self.instagram_pool.call(lambda account: self.download_with_account(url, output_path, account))
+
+    def fetch_media(self, media_url: str, http_headers: Dict) -> requests.Response:
+        """Open a streamed CDN media request through the session pool, paced like other Instagram requests."""
+        return self.instagram_pool.call(lambda account: fetch_media(media_url, http_headers))
 
-        cookies = self.get_instagram_cookies()
-        logger.info("Got Instagram cookies")
+    def download_with_account(self, url: str, output_path: str, account: InstagramAccount) -> None:
+        cookies = self.get_instagram_cookies(account)
+        logger.info(f"Got Instagram cookies for account {account.label}")
 
         ydl_opts = {
             'outtmpl': output_path,
@@ -168,31 +285,58 @@ class InstagramTranscriber:
             logger.error(error_msg, exc_info=True)
             
             # Add diagnostic information
-            logger.error(f"Instagram credentials: Username={self.instagram_username}, Password={'*' * (len(self.instagram_password or '') if self.instagram_password else 0)}")
+            logger.error(f"Instagram credentials: Username={account.username}, Password={'*' * len(account.password or '')}")
             raise
         except Exception as e:
             error_msg = f"Error during download: {str(e)}"
             logger.error(error_msg, exc_info=True)
             raise
 
-    def get_instagram_cookies(self) -> Dict:
-        """Get cookies needed for Instagram authentication."""
+    def get_instagram_cookies(self, account: InstagramAccount) -> Dict:
+        """
+        Get cookies needed for Instagram authentication.
+
+        Sessions are cached per account, so logging in only happens once per session TTL
+        or after the account was challenged.
+
+        Raises:
+            InstagramThrottled: If Instagram rate-limits or challenges the login
+        """
+        cookies = self.instagram_pool.cached_cookies(account)
+        if cookies is not None:
+            return cookies
+        if not account.username:
+            logger.info("No Instagram credentials configured, continuing without a session")
+            return {}
+
+        with account.login_lock:
+            # Another request may have logged this account in while we waited
+            cookies = self.instagram_pool.cached_cookies(account)
+            if cookies is not None:
+                return cookies
+            # The login round trip is extra Instagram traffic on this account
+            self.instagram_pool.acquire(account)
+            return self.login_to_instagram(account)
+
+    def login_to_instagram(self, account: InstagramAccount) -> Dict:
         try:
-            logger.info("Starting Instagram authentication process")
+            logger.info(f"Starting Instagram authentication process for account {account.label}")
             session = requests.Session()
             
             # First request to get the csrftoken
             logger.info("Making initial request to Instagram to get csrftoken")
-            initial_response = session.get('https://www.instagram.com/accounts/login/')
+            initial_response = session.get(f'{INSTAGRAM_BASE_URL}/accounts/login/')
             logger.info(f"Initial request status code: {initial_response.status_code}")
+            if initial_response.status_code == 429:
+                raise InstagramThrottled(f"login page returned {initial_response.status_code}")
             
             cookies = session.cookies.get_dict()
             logger.info(f"Got initial cookies: {list(cookies.keys())}")
 
             # Login request
             login_data = {
-                'username': self.instagram_username,
-                'enc_password': f'#PWD_INSTAGRAM_BROWSER:0:{int(time.time())}:{self.instagram_password}',
+                'username': account.username,
+                'enc_password': f'#PWD_INSTAGRAM_BROWSER:0:{int(time.time())}:{account.password}',
                 'queryParams': {},
                 'optIntoOneTap': 'false'
             }
@@ -200,21 +344,29 @@ class InstagramTranscriber:
             login_headers = {
                 'X-CSRFToken': cookies.get('csrftoken', ''),
                 'X-Requested-With': 'XMLHttpRequest',
-                'Referer': 'https://www.instagram.com/accounts/login/'
+                'Referer': f'{INSTAGRAM_BASE_URL}/accounts/login/'
             }
             
             logger.info("Sending login request to Instagram")
             login_response = session.post(
-                'https://www.instagram.com/accounts/login/ajax/',
+                f'{INSTAGRAM_BASE_URL}/accounts/login/ajax/',
                 data=login_data,
                 headers=login_headers
             )
             
             logger.info(f"Login response status code: {login_response.status_code}")
+            if login_response.status_code == 429:
+                raise InstagramThrottled(f"login returned {login_response.status_code}")
             
             # Try to get response JSON for debugging
             try:
                 response_json = login_response.json()
+            except Exception as json_error:
+                response_json = None
+                logger.warning(f"Could not parse login response as JSON: {str(json_error)}")
+            if is_challenge_payload(response_json):
+                raise InstagramThrottled(f"login answered {response_json['message']}")
+            if response_json is not None:
                 # Don't log the full response as it might contain sensitive info
                 logger.info(f"Login response contains fields: {list(response_json.keys()) if isinstance(response_json, dict) else 'Not a dict'}")
                 
@@ -224,17 +376,19 @@ class InstagramTranscriber:
                         logger.info("Instagram authentication successful")
                     else:
                         logger.warning(f"Instagram authentication failed: {response_json.get('message', 'Unknown reason')}")
-            except Exception as json_error:
-                logger.warning(f"Could not parse login response as JSON: {str(json_error)}")
-            
+
             final_cookies = session.cookies.get_dict()
             logger.info(f"Final cookies: {list(final_cookies.keys())}")
             
             # Check for critical cookies
             if 'sessionid' not in final_cookies:
                 logger.warning("Session ID cookie not found in response, authentication may have failed")
+            else:
+                self.instagram_pool.store_cookies(account, final_cookies)
                 
             return final_cookies
+        except InstagramThrottled:
+            raise
         except Exception as e:
             error_msg = f"Error during Instagram authentication: {str(e)}"
             logger.error(error_msg, exc_info=True)
@@ -258,22 +412,32 @@ class InstagramTranscriber:
 
         return f"gs://{self.bucket_name}/{blob_name}"
 
-    def transcribe_with_whisper(self, actual_file: str) -> str:
-        """Transcribe audio using OpenAI's Whisper API."""
+    def transcribe_with_whisper(self, actual_file: str, language: Optional[str] = None) -> Dict:
+        """
+        Transcribe audio using OpenAI's Whisper API.
+
+        Passing a language skips the API's language detection.
+
+        Returns:
+            Dict: text, detected language code and segments (with avg_logprob)
+        """
         if not self.openai_client:
             raise ValueError("OpenAI API key not set in environment variables")
 
-        logger.info("Starting Whisper transcription")
+        logger.info(f"Starting Whisper transcription (language hint: {language or 'none'})")
+        options = {'language': language} if language else {}
         with open(actual_file, "rb") as audio_file:
             transcript = self.openai_client.audio.transcriptions.create(
                 model="whisper-1",
                 file=audio_file,
-                response_format="text"
+                response_format="verbose_json",
+                **options
             )
         logger.info("Whisper transcription completed")
-        return transcript
+        return whisper_transcription(transcript.model_dump() if hasattr(transcript, 'model_dump') else transcript)
 
-    def transcribe_with_google(self, actual_file: str) -> str:
+    def transcribe_with_google(self, actual_file: str, language: Optional[str] = None,
+                               detect_language: bool = False) -> Dict:
         """Transcribe audio using Google Speech-to-Text."""
         if not self.bucket_name:
             raise ValueError("GCP_STORAGE_BUCKET environment variable not set")
@@ -282,16 +446,30 @@ class InstagramTranscriber:
         gcs_uri = self.upload_to_gcs(actual_file)
         logger.info(f"Uploaded to GCS: {gcs_uri}")
 
+        return self.recognize_gcs_audio(gcs_uri, language, detect_language)
+
+    def recognize_gcs_audio(self, gcs_uri: str, language: Optional[str] = None, detect_language: bool = False) -> Dict:
+        """Run Google Speech-to-Text on an MP3 already in GCS, deleting the object afterwards."""
+        return google_transcription(self.recognize_gcs(gcs_uri, language, detect_language), language)
+
+    def recognize_gcs(self, gcs_uri: str, language: Optional[str] = None, detect_language: bool = False):
+        """
+        The full Speech-to-Text response (with word time offsets) for an MP3 in GCS, deleting the object afterwards.
+
+        With detect_language, Google also listens for GOOGLE_ALTERNATIVE_LANGUAGES and reports the
+        language it recognised on each result, so an unknown or wrongly hinted language can be learned.
+        """
         try:
             # Configure the transcription request
             audio = speech_v1.RecognitionAudio(uri=gcs_uri)
             config = speech_v1.RecognitionConfig(
                 encoding=speech_v1.RecognitionConfig.AudioEncoding.MP3,
                 sample_rate_hertz=44100,
-                language_code="en-US",
+                language_code=google_language_code(language),
                 enable_automatic_punctuation=True,
                 audio_channel_count=2,
                 enable_word_time_offsets=True,
+                alternative_language_codes=google_alternative_codes(language) if detect_language else [],
             )
 
             # Start long-running transcription
@@ -299,12 +477,7 @@ class InstagramTranscriber:
             logger.info("Waiting for transcription to complete...")
             response = operation.result()
             logger.info("Transcription completed")
-
-            # Combine all transcriptions
-            return " ".join(
-                result.alternatives[0].transcript
-                for result in response.results
-            )
+            return response
         finally:
             # Clean up GCS
             logger.info("Cleaning up GCS bucket")
@@ -313,7 +486,80 @@ class InstagramTranscriber:
             blob.delete()
             logger.info("GCS cleanup completed")
 
-    def transcribe(self, url: str, temp_dir: Optional[str] = None, use_whisper: bool = True) -> Dict:
+    def transcribe_streaming(self, info: Dict, use_whisper: bool = True, language: Optional[str] = None,
+                             detect_language: bool = False) -> Dict:
+        """
+        Transcribe without writing audio to /tmp.
+
+        The selected audio format is downloaded, transcoded by ffmpeg and sent to the backend
+        (a chunked multipart request to the Whisper API, or a resumable GCS upload for Google)
+        in fixed-size chunks.
+
+        Raises:
+            AudioSourceUnavailable: If no format can be streamed; callers fall back to downloading
+            AudioStreamError: If fetching or transcoding the media failed; callers fall back to downloading
+            MemoryLimitExceeded: If the job goes over MAX_JOB_RSS_MB
+        """
+        audio_format = select_audio_format(info)
+        logger.info(f"Streaming audio format {audio_format.get('format_id', 'unknown')} "
+                    f"({audio_format.get('ext', 'unknown')})")
+
+        stream = AudioTranscodeStream(
+            audio_format['url'],
+            http_headers=audio_format.get('http_headers') or info.get('http_headers'),
+            transcode_args=WHISPER_TRANSCODE_ARGS if use_whisper else GOOGLE_TRANSCODE_ARGS,
+            max_rss_bytes=self.max_job_rss_bytes,
+            # The resumable upload holds a chunk of the job's audio until it is sent
+            buffered_bytes=0 if use_whisper else GCS_UPLOAD_CHUNK_SIZE,
+            fetch=self.fetch_media
+        )
+
+        try:
+            if use_whisper:
+                if not self.openai_client:
+                    raise ValueError("OpenAI API key not set in environment variables")
+
+                logger.info(f"Starting streamed Whisper transcription (language hint: {language or 'none'})")
+                fields = {'model': 'whisper-1', 'response_format': 'verbose_json'}
+                if language:
+                    fields['language'] = language
+                response = stream_to_openai_transcription(
+                    self.openai_client.api_key,
+                    str(self.openai_client.base_url),
+                    stream.chunks(),
+                    fields
+                )
+                logger.info("Whisper transcription completed")
+                return whisper_transcription(response.json())
+
+            if not self.bucket_name:
+                raise ValueError("GCP_STORAGE_BUCKET environment variable not set")
+
+            blob_name = f"audio/{uuid.uuid4()}.mp3"
+            logger.info(f"Streaming upload to gs://{self.bucket_name}/{blob_name}")
+            upload_stream_to_gcs(self.storage_client.bucket(self.bucket_name), blob_name, stream.chunks())
+            logger.info("Upload completed")
+            return self.recognize_gcs_audio(f"gs://{self.bucket_name}/{blob_name}", language, detect_language)
+        except Exception as e:
+            # The HTTP client may wrap an error raised inside the request body; report the stream's own
+            if stream.error is not None and e is not stream.error:
+                raise stream.error from e
+            raise
+        finally:
+            logger.info(f"Streaming job stats: in={stream.bytes_in} out={stream.bytes_out} "
+                        f"peak_job_rss_mb={stream.peak_job_rss // (1024 * 1024)} "
+                        f"process_peak_rss_mb={peak_rss_bytes() // (1024 * 1024)}")
+
+    def build_result(self, info: Dict, url: str, transcript_text: str) -> Dict:
+        return {
+            'transcript': f"{str(transcript_text)}\n\nSource: {url}",
+            'title': str(info.get('description', '')),
+            'author': f"{str(info.get('uploader', ''))} ({str(info.get('channel', ''))})",
+            'source_url': url
+        }
+
+    def transcribe(self, url: str, temp_dir: Optional[str] = None, use_whisper: bool = True,
+                   language: Optional[str] = None) -> Dict:
         """
         Transcribe an Instagram video/reel using either OpenAI's Whisper or Google Speech-to-Text.
 
@@ -321,6 +567,8 @@ class InstagramTranscriber:
             url (str): The Instagram video/reel URL to transcribe
             temp_dir (Optional[str]): Directory for temporary files. Defaults to /tmp
             use_whisper (bool): If True, use OpenAI's Whisper API; if False, use Google Speech-to-Text
+            language (Optional[str]): Spoken language code. When omitted, the language last detected
+                for the same creator is used, so the backend can skip detection.
 
         Returns:
             Dict: Contains transcript text, title, author, and source URL
@@ -329,9 +577,58 @@ class InstagramTranscriber:
 
         info = self.get_video_info(url)
         logger.info(f"Video info: {info}")
+        return self.transcribe_info(info, url, temp_dir, use_whisper, language)
+
+    def transcribe_info(self, info: Dict, url: str, temp_dir: Optional[str] = None, use_whisper: bool = True,
+                        language: Optional[str] = None) -> Dict:
+        """Transcribe a reel whose video info is already known, applying and updating the creator's language hint."""
+        creator = creator_key(info)
+        hint = None if language else self.language_hints.get(creator)
+        # Without an explicit language, Google also listens for other languages so a hint can be learned or corrected
+        transcription = self.transcribe_audio(info, url, temp_dir, use_whisper, language or hint,
+                                              detect_language=not language)
+
+        if use_whisper:
+            confidence = average_logprob(transcription['segments'])
+            low_confidence = confidence is not None and confidence < LOW_CONFIDENCE_LOGPROB
+            if hint and low_confidence:
+                logger.info(f"Low confidence ({confidence:.2f}) with language hint {hint}, re-detecting language")
+                transcription = self.transcribe_audio(info, url, temp_dir, use_whisper, None)
+                confidence = average_logprob(transcription['segments'])
+                low_confidence = confidence is not None and confidence < LOW_CONFIDENCE_LOGPROB
+            if not language and not low_confidence:
+                self.language_hints.record(creator, transcription['language'])
+        elif not language and transcription['text'].strip():
+            confidence = transcription.get('confidence')
+            if confidence is None or confidence >= GOOGLE_MIN_CONFIDENCE:
+                self.language_hints.record(creator, transcription['language'])
+
+        return self.build_result(info, url, transcription['text'])
+
+    def transcribe_audio(self, info: Dict, url: str, temp_dir: Optional[str], use_whisper: bool,
+                         language: Optional[str], detect_language: bool = False) -> Dict:
+        """
+        Run the chosen backend on the reel's audio, streaming it when possible.
+
+        Returns:
+            Dict: text, language and segments (segments are only available from Whisper)
+        """
+        if self.stream_audio:
+            try:
+                return self.transcribe_streaming(info, use_whisper, language, detect_language)
+            except MemoryLimitExceeded:
+                # Staging the same audio in memory-backed /tmp would only use more memory
+                raise
+            except AudioSourceUnavailable as e:
+                logger.info(f"Audio cannot be streamed ({str(e)}), downloading instead")
+            except AudioStreamError as e:
+                # Backend errors (rejected requests, auth, rate limits) are raised as they are: the download
+                # path would send the same request and pay for a second CDN fetch before failing the same way
+                logger.warning(f"Streaming transcription failed, retrying with download: {str(e)}", exc_info=True)
 
         temp_dir = temp_dir or '/tmp'
-        base_temp_file = os.path.join(temp_dir, 'temp_audio')
+        # Unique per run so concurrent jobs on one instance don't overwrite each other's audio
+        base_temp_file = os.path.join(temp_dir, f'temp_audio_{uuid.uuid4().hex}')
 
         try:
             logger.info(f"Attempting to download video from {url}")
@@ -353,18 +650,9 @@ class InstagramTranscriber:
                 raise FileNotFoundError(f"No audio file found with base name {base_temp_file}")
 
             # Choose transcription method
-            transcript_text = (
-                self.transcribe_with_whisper(actual_file)
-                if use_whisper else
-                self.transcribe_with_google(actual_file)
-            )
-
-            return {
-                'transcript': f"{str(transcript_text)}\n\nSource: {url}",
-                'title': str(info.get('description', '')),
-                'author': f"{str(info.get('uploader', ''))} ({str(info.get('channel', ''))})",
-                'source_url': url
-            }
+            if use_whisper:
+                return self.transcribe_with_whisper(actual_file, language)
+            return self.transcribe_with_google(actual_file, language, detect_language)
 
         except Exception as e:
             error_msg = f"Error in transcribe: {str(e)}"
@@ -384,10 +672,179 @@ class InstagramTranscriber:
                         logger.warning(f"Failed to clean up {file_path}: {str(e)}")
 
 
+    def fetch_pcm(self, info: Dict) -> bytes:
+        """A reel's audio as 16 kHz mono PCM, streamed from the CDN through ffmpeg."""
+        audio_format = select_audio_format(info)
+        stream = AudioTranscodeStream(
+            audio_format['url'],
+            http_headers=audio_format.get('http_headers') or info.get('http_headers'),
+            transcode_args=PCM_TRANSCODE_ARGS,
+            max_rss_bytes=self.max_job_rss_bytes,
+            output_format='s16le',
+            fetch=self.fetch_media
+        )
+        return b''.join(stream.chunks())
+
+    def transcribe_packed(self, infos: List[Dict], use_whisper: bool,
+                          language: Optional[str]) -> Tuple[List[Dict], Set[int]]:
+        """
+        Transcribe several short clips with one backend request.
+
+        The clips are joined with silence between them, sent as one file, and the timed output
+        (Whisper segments, Google word offsets) is split back by each clip's known offsets. All of
+        the pack's PCM is held in memory (32 KB per second of audio, twice that while joining).
+
+        Returns:
+            Tuple: text, language and segments per clip, and the positions of clips whose split is
+                ambiguous (a segment crossed a separator, or text was decoded from the silence)
+        """
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            clips_pcm = list(executor.map(self.fetch_pcm, infos))
+        audio, layout = packed_pcm(clips_pcm)
+        # Only the joined copy is needed from here on
+        del clips_pcm
+        logger.info(f"Packed {len(infos)} clips into {layout[-1][1]:.1f}s of audio")
+
+        if use_whisper:
+            if not self.openai_client:
+                raise ValueError("OpenAI API key not set in environment variables")
+            fields = {'model': 'whisper-1', 'response_format': 'verbose_json'}
+            if language:
+                fields['language'] = language
+            payload = stream_to_openai_transcription(
+                self.openai_client.api_key,
+                str(self.openai_client.base_url),
+                encode_pcm(audio, WHISPER_TRANSCODE_ARGS),
+                fields
+            ).json()
+            segments = payload.get('segments') or []
+            per_clip, ambiguous = split_segments(segments, layout)
+            if payload.get('text', '').strip() and not segments:
+                # Nothing to split by
+                ambiguous = set(range(len(infos)))
+            detected = whisper_language_code(payload.get('language'))
+            return [
+                {
+                    'text': ''.join(segment['text'] for segment in clip_segments).strip(),
+                    'language': detected,
+                    'segments': [segment for segment in clip_segments if segment.get('avg_logprob') is not None]
+                }
+                for clip_segments in per_clip
+            ], ambiguous
+
+        if not self.bucket_name:
+            raise ValueError("GCP_STORAGE_BUCKET environment variable not set")
+        blob_name = f"audio/{uuid.uuid4()}.mp3"
+        upload_stream_to_gcs(self.storage_client.bucket(self.bucket_name), blob_name,
+                             encode_pcm(audio, GOOGLE_TRANSCODE_ARGS))
+        response = self.recognize_gcs(f"gs://{self.bucket_name}/{blob_name}", language)
+        alternatives = [result.alternatives[0] for result in response.results if result.alternatives]
+        words = [
+            {'word': word.word, 'start': word.start_time.total_seconds(), 'end': word.end_time.total_seconds()}
+            for alternative in alternatives for word in alternative.words
+        ]
+        texts, ambiguous = split_words(words, layout)
+        if any(alternative.transcript.strip() for alternative in alternatives) and not words:
+            ambiguous = set(range(len(infos)))
+        return [{'text': text, 'language': language, 'segments': []} for text in texts], ambiguous
+
+    def transcribe_many(self, urls: List[str], temp_dir: Optional[str] = None, use_whisper: bool = True,
+                        language: Optional[str] = None) -> List[Dict]:
+        """
+        Transcribe a batch of reels, packing short clips into shared backend requests.
+
+        Clips up to PACK_MAX_CLIP_SECONDS long that share a language (given, hinted or unknown)
+        are packed together. Clips that are ambiguous after splitting, have low confidence in the
+        packed decode, belong to a failed pack, or can't be packed at all are transcribed on their own.
+
+        Returns:
+            List[Dict]: Per URL, in order: {'url', 'status': 'done', 'result'} or {'url', 'status': 'failed', 'error'}
+        """
+        items = [{'url': url} for url in urls]
+        clips = []
+        for index, url in enumerate(urls):
+            try:
+                info = self.get_video_info(url)
+            except Exception as e:
+                items[index].update(status=JOB_FAILED, error=str(e))
+                continue
+            creator = creator_key(info)
+            clips.append({
+                'index': index,
+                'info': info,
+                'creator': creator,
+                'duration': info.get('duration') or 0,
+                'language': language or self.language_hints.get(creator)
+            })
+
+        packable = []
+        if self.pack_clips:
+            for clip in clips:
+                try:
+                    select_audio_format(clip['info'])
+                except AudioSourceUnavailable:
+                    continue
+                if 0 < clip['duration'] <= PACK_MAX_CLIP_SECONDS:
+                    packable.append(clip)
+
+        # Packs are held in memory as PCM, so they must fit in the job's memory limit too
+        max_pack_seconds = PACK_MAX_SECONDS
+        if self.max_job_rss_bytes:
+            max_pack_seconds = min(max_pack_seconds, self.max_job_rss_bytes / PACK_PEAK_BYTES_PER_SECOND)
+
+        backend_requests = packed_clips = 0
+        for pack in plan_packs(packable, max_pack_seconds):
+            members = [packable[position] for position in pack]
+            # Failed packs count too: their clips cost this request and another one each
+            backend_requests += 1
+            try:
+                transcriptions, ambiguous = self.transcribe_packed(
+                    [member['info'] for member in members], use_whisper, members[0]['language']
+                )
+            except Exception as e:
+                logger.warning(f"Packed transcription of {len(members)} clips failed, "
+                               f"transcribing them one by one: {str(e)}", exc_info=True)
+                continue
+
+            for position, member in enumerate(members):
+                if position in ambiguous:
+                    continue
+                transcription = transcriptions[position]
+                if use_whisper:
+                    # A clip in another language than the pack's decodes with low confidence
+                    confidence = average_logprob(transcription['segments'])
+                    if confidence is not None and confidence < LOW_CONFIDENCE_LOGPROB:
+                        continue
+                    if not language:
+                        self.language_hints.record(member['creator'], transcription['language'])
+                items[member['index']].update(
+                    status=JOB_DONE,
+                    result=self.build_result(member['info'], urls[member['index']], transcription['text'])
+                )
+                packed_clips += 1
+
+        for clip in clips:
+            item = items[clip['index']]
+            if 'status' in item:
+                continue
+            try:
+                item.update(status=JOB_DONE, result=self.transcribe_info(
+                    clip['info'], item['url'], temp_dir, use_whisper, language
+                ))
+            except Exception as e:
+                logger.error(f"Error transcribing {item['url']}: {str(e)}", exc_info=True)
+                item.update(status=JOB_FAILED, error=str(e))
+            backend_requests += 1
+
+        logger.info(f"Bulk transcription of {len(urls)} reels: {packed_clips} served from packed requests, "
+                    f"{backend_requests} backend requests in total")
+        return items
+
+
 class ReadwiseUploader:
     def __init__(self, token: str):
         self.token = token
-        self.base_url = "https://readwise.io/api/v2"
+        self.base_url = READWISE_BASE_URL
         self.headers = {
             "Authorization": f"Token {token}",
             "Content-Type": "application/json"
@@ -427,12 +884,29 @@ class ReadwiseUploader:
             return False
 
 
+# Shared by every request on this instance so identical in-flight requests can be merged
+job_coordinator = JobCoordinator(create_job_store())
+
+
+def job_response(job: Dict) -> Dict:
+    """Public view of a job record for status polling."""
+    response = {
+        'jobId': job['jobId'],
+        'status': job['status']
+    }
+    if job['status'] == JOB_DONE:
+        response['result'] = job['result']
+    elif job['status'] == JOB_FAILED:
+        response['error'] = job['error']
+    return response
+
+
 @functions_framework.http
 def transcribe_reel(request):
     if request.method == 'OPTIONS':
         headers = {
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'POST',
+            'Access-Control-Allow-Methods': 'GET, POST',
             'Access-Control-Allow-Headers': 'Content-Type',
             'Access-Control-Max-Age': '3600'
         }
@@ -442,54 +916,141 @@ def transcribe_reel(request):
 
     try:
         logger.info("Starting transcribe_reel function")
+
+        # Status polling: GET ?jobId=... returns the job state and, once done, its result
+        if request.method == 'GET':
+            job_id = request.args.get('jobId')
+            if not job_id:
+                return jsonify({'error': 'No jobId provided'}), 400, headers
+            job = job_coordinator.store.get(job_id)
+            if not job:
+                return jsonify({'error': f'Unknown jobId: {job_id}'}), 404, headers
+            return jsonify(job_response(job)), 200, headers
+
         request_json = request.get_json()
         # Log request data without sensitive information
-        safe_request = {k: v for k, v in request_json.items() if k not in ['readwise_token']}
+        safe_request = {k: v for k, v in (request_json or {}).items() if k not in ['readwise_token']}
         logger.info(f"Received request: {json.dumps(safe_request)}")
 
-        if not request_json or 'url' not in request_json:
+        if request_json and 'jobId' in request_json and 'url' not in request_json:
+            job = job_coordinator.store.get(request_json['jobId'])
+            if not job:
+                return jsonify({'error': f"Unknown jobId: {request_json['jobId']}"}), 404, headers
+            return jsonify(job_response(job)), 200, headers
+
+        # Bulk mode: {"urls": [...]} transcribes a batch, packing short reels into shared requests
+        urls = request_json.get('urls') if request_json else None
+        if urls is not None and (not isinstance(urls, list) or not urls):
+            return jsonify({'error': 'urls must be a non-empty list'}), 400, headers
+
+        if not request_json or ('url' not in request_json and urls is None):
             logger.error("No URL provided in request")
             return jsonify({'error': 'No URL provided'}), 400, headers
 
-        url = request_json['url']
+        url = request_json.get('url')
         user_id = request_json.get('userId')
         callback_url = request_json.get('callbackUrl')
         upload_to_readwise = request_json.get('upload_to_readwise', False)
         readwise_token = request_json.get('readwise_token')
         use_whisper = request_json.get('use_whisper', True)  # Default to Whisper
+        language = request_json.get('language')
 
         # Verify needed parameters if we're using the callback approach
         if callback_url and not user_id:
             logger.error("userId is required when using callback")
             return jsonify({'error': 'userId is required when using callback'}), 400, headers
 
+        if upload_to_readwise and not readwise_token and not callback_url:
+            return jsonify({'error': 'Readwise token required for upload'}), 400, headers
+
+        # Sync mode: url is a profile or collection; the caller keeps the index and passes known IDs in.
+        # The new reels then run as a batch, so short ones are packed together
+        sync_reels = None
+        known_ids = request_json.get('known_ids', [])
+        if request_json.get('sync'):
+            if not url:
+                return jsonify({'error': 'Sync requires a profile or collection url'}), 400, headers
+            sync_reels = InstagramTranscriber().list_new_reels(
+                url, known_ids, request_json.get('limit'), request_json.get('stop_after_known')
+            )
+            logger.info(f"Sync found {len(sync_reels)} new reels at {url}")
+            if not sync_reels:
+                return jsonify({'items': [], 'processed_ids': sorted(set(known_ids))}), 200, headers
+            urls = [reel['url'] for reel in sync_reels]
+
+        def with_sync(batch: Dict) -> Dict:
+            """A batch result as a sync response: reel IDs on the items and the updated processed_ids."""
+            if sync_reels is None:
+                return batch
+            items = [{**reel, **item} for reel, item in zip(sync_reels, batch['items'])]
+            # Only successes are indexed, so the next sync retries failed reels
+            processed_ids = set(known_ids) | {item['reel_id'] for item in items if item['status'] == JOB_DONE}
+            return {**batch, 'items': items, 'processed_ids': sorted(processed_ids)}
+
+        # Requests for the same reel (or batch) and backend share one download and transcription
+        backend_key = f"{'whisper' if use_whisper else 'google'}|{language or 'auto'}"
+        if urls is not None:
+            job_key = f"bulk|{','.join(sorted(canonical_reel_key(item) for item in urls))}|{backend_key}"
+        else:
+            job_key = f"{canonical_reel_key(url)}|{backend_key}"
+
+        def run_pipeline() -> Dict:
+            transcriber = InstagramTranscriber()
+            if urls is not None:
+                logger.info(f"Pipeline started for {len(urls)} URLs")
+                return {'items': transcriber.transcribe_many(urls, '/tmp', use_whisper=use_whisper, language=language)}
+            logger.info(f"Pipeline started for URL: {url}")
+            return transcriber.transcribe(url, '/tmp', use_whisper=use_whisper, language=language)
+
+        def upload_items(items: List[Dict]) -> List[Dict]:
+            """This requester's copy of a batch, with finished transcripts uploaded to Readwise."""
+            uploader = ReadwiseUploader(readwise_token)
+            uploaded = []
+            for item in items:
+                item = dict(item)
+                if item['status'] == JOB_DONE:
+                    item['result'] = dict(item['result'])
+                    item['result']['readwise_upload'] = uploader.upload_transcript(item['result'])
+                uploaded.append(item)
+            return uploaded
+
         # If callback provided, process asynchronously
         if callback_url:
             logger.info(f"Processing asynchronously with callback URL: {callback_url}")
 
-            # Define the background processing function
-            def process_transcription():
+            # Runs once the shared pipeline finishes; each requester gets its own upload and callback
+            def deliver_result(job: Dict, result: Optional[Dict], error: Optional[str]) -> None:
+                if error:
+                    logger.error(f"Job {job['jobId']} failed for URL {url or urls}, no callback sent: {error}")
+                    return
+
+                if urls is not None:
+                    try:
+                        items = result['items']
+                        if upload_to_readwise and readwise_token:
+                            items = upload_items(items)
+                        done = sum(1 for item in items if item['status'] == JOB_DONE)
+                        logger.info(f"Batch job {job['jobId']}: {done}/{len(items)} transcribed, queueing callback")
+                        get_dispatcher().submit(
+                            callback_url, {'userId': user_id, 'jobId': job['jobId'], **with_sync({'items': items})}
+                        )
+                    except Exception as e:
+                        logger.error(f"Error in background processing: {str(e)}", exc_info=True)
+                    return
+
                 try:
-                    logger.info(f"Background processing started for URL: {url}")
-                    # Initialize transcriber
-                    transcriber = InstagramTranscriber()
-                    
-                    # Get transcript and metadata
-                    result = transcriber.transcribe(url, '/tmp', use_whisper=use_whisper)
                     logger.info("Transcription completed, preparing to send callback")
-                    
+
                     # Upload to Readwise if requested
                     if upload_to_readwise and readwise_token:
                         uploader = ReadwiseUploader(readwise_token)
                         upload_result = uploader.upload_transcript(result)
                         result['readwise_upload'] = upload_result
-                    
-                    # Call back to the app with results
-                    logger.info(f"Sending callback to: {callback_url}")
-                    
-                    # Log the callback data
+
+                    # Hand the result to the dispatcher; delivery and retries happen off this thread
                     callback_data = {
                         'userId': user_id,
+                        'jobId': job['jobId'],
                         'result': result
                     }
                     # Safely log the callback data without overwhelming the logs
@@ -497,6 +1058,7 @@ def transcribe_reel(request):
                         # Create a sanitized version for logging (just basic info)
                         log_data = {
                             'userId': user_id,
+                            'jobId': job['jobId'],
                             'result': {
                                 'title': result.get('title', '')[:50],
                                 'author': result.get('author', '')[:50],
@@ -507,55 +1069,41 @@ def transcribe_reel(request):
                         logger.info(f"Callback data summary: {json.dumps(log_data)}")
                     except Exception as log_error:
                         logger.error(f"Error logging callback data: {log_error}")
-                    
-                    # Make the callback request
-                    try:
-                        callback_response = requests.post(
-                            callback_url,
-                            json=callback_data,
-                            headers={'Content-Type': 'application/json'},
-                            timeout=30  # Add a timeout
-                        )
-                        logger.info(f"Callback response status: {callback_response.status_code}")
-                        logger.info(f"Callback response headers: {callback_response.headers}")
-                        
-                        # Log response content
-                        try:
-                            response_text = callback_response.text
-                            logger.info(f"Callback response body: {response_text[:500]}{'...' if len(response_text) > 500 else ''}")
-                        except Exception as text_error:
-                            logger.error(f"Error reading callback response text: {text_error}")
-                        
-                        if not callback_response.ok:
-                            logger.error(f"Callback failed with status code: {callback_response.status_code}")
-                    except Exception as callback_error:
-                        logger.error(f"Exception during callback request: {callback_error}", exc_info=True)
+
+                    logger.info(f"Queueing callback to: {callback_url}")
+                    get_dispatcher().submit(callback_url, callback_data)
                 except Exception as e:
                     # Log the full exception with traceback as a single record
                     error_msg = f"Error in background processing: {str(e)}"
                     logger.error(error_msg, exc_info=True)
-            
-            # Start processing in background
-            import threading
-            threading.Thread(target=process_transcription).start()
-            logger.info("Background processing thread started")
-            
+
+            job, joined = job_coordinator.submit(job_key, run_pipeline, deliver_result)
+            logger.info(f"Job {job['jobId']} {'joined' if joined else 'started'} for key {job_key}")
+
             # Return immediate success response
             return jsonify({
                 'success': True,
-                'message': 'Transcription started successfully'
+                'message': 'Transcription started successfully',
+                'jobId': job['jobId'],
+                'coalesced': joined
             }), 200, headers
-        
-        # Otherwise, process synchronously as before
+
+        # Otherwise, process synchronously, still sharing any identical run in flight
         else:
             logger.info("Processing synchronously")
-            transcriber = InstagramTranscriber()
-            result = transcriber.transcribe(url, '/tmp', use_whisper=use_whisper)
+            job, joined = job_coordinator.submit(job_key, run_pipeline)
+            job = job_coordinator.wait(job['jobId'])
 
-            if upload_to_readwise:
-                if not readwise_token:
-                    return jsonify({'error': 'Readwise token required for upload'}), 400, headers
+            if job['status'] != JOB_DONE:
+                raise RuntimeError(job.get('error') or f"Job {job['jobId']} did not complete")
+            result = dict(job['result'])
+
+            if urls is not None:
+                if upload_to_readwise:
+                    result['items'] = upload_items(result['items'])
+                return jsonify(with_sync(result)), 200, headers
 
+            if upload_to_readwise:
                 uploader = ReadwiseUploader(readwise_token)
                 upload_result = uploader.upload_transcript(result)
                 result['readwise_upload'] = upload_result
@@ -565,4 +1113,4 @@ def transcribe_reel(request):
     except Exception as e:
         error_msg = f"Error in transcribe_reel: {str(e)}"
         logger.error(error_msg, exc_info=True)
-        return jsonify({'error': str(e), 'type': type(e).__name__}), 500, headers
\ No newline at end of file
+        return jsonify({'error': str(e), 'type': type(e).__name__}), 500, headers
@@ -0,0 +1,171 @@
+import os
+import subprocess
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from streaming import CHUNK_SIZE
+
+# Clips are concatenated as 16 kHz mono PCM and encoded once for the backend
+PCM_SAMPLE_RATE = 16000
+PCM_BYTES_PER_SECOND = PCM_SAMPLE_RATE * 2
+PCM_TRANSCODE_ARGS = ['-ac', '1', '-ar', str(PCM_SAMPLE_RATE), '-acodec', 'pcm_s16le']
+
+# Only short clips are worth packing; longer ones are dominated by their own decode time
+PACK_MAX_CLIP_SECONDS = float(os.environ.get('PACK_MAX_CLIP_SECONDS', 90))
+# Keeps a packed Whisper upload far below the API's 25 MB limit
+PACK_MAX_SECONDS = float(os.environ.get('PACK_MAX_SECONDS', 600))
+# A pack's PCM is held in memory: every clip's plus the joined copy while joining, about 38 MB for 600 s
+PACK_PEAK_BYTES_PER_SECOND = 2 * PCM_BYTES_PER_SECOND
+# Silence between clips: long enough that both backends end a segment/phrase there
+PACK_SILENCE_SECONDS = float(os.environ.get('PACK_SILENCE_SECONDS', 1.5))
+# A segment may spill this far into a neighbouring clip (timestamp jitter) and still count as one clip's
+SPLIT_TOLERANCE_SECONDS = 0.3
+
+
+def plan_packs(clips: Sequence[Dict], max_pack_seconds: float = PACK_MAX_SECONDS) -> List[List[int]]:
+    """
+    Group clips into packs of at most max_pack_seconds, in order, never mixing languages
+
+    Args:
+        clips: Dicts with 'duration' (seconds) and 'language' (code, or None when unknown)
+
+    Returns:
+        List[List[int]]: Indexes into clips, one list per pack. Single-clip packs are left out;
+            those clips gain nothing from packing.
+    """
+    open_packs: Dict[Optional[str], Tuple[List[int], float]] = {}
+    packs = []
+    for index, clip in enumerate(clips):
+        language = clip.get('language')
+        members, total = open_packs.get(language, ([], 0.0))
+        added = clip['duration'] + (PACK_SILENCE_SECONDS if members else 0.0)
+        if members and total + added > max_pack_seconds:
+            packs.append(members)
+            members, total, added = [], 0.0, clip['duration']
+        members.append(index)
+        open_packs[language] = (members, total + added)
+    packs.extend(members for members, _ in open_packs.values())
+    return [pack for pack in packs if len(pack) > 1]
+
+
+def pack_layout(durations: Sequence[float], silence_seconds: float = PACK_SILENCE_SECONDS) -> List[Tuple[float, float]]:
+    """(start, end) of each clip within the packed audio."""
+    layout = []
+    position = 0.0
+    for duration in durations:
+        layout.append((position, position + duration))
+        position += duration + silence_seconds
+    return layout
+
+
+def _assign(start: float, end: float, layout: Sequence[Tuple[float, float]],
+            tolerance: float) -> Tuple[Optional[int], Set[int]]:
+    """
+    The clip a timed span belongs to, or (None, clips made ambiguous by it)
+
+    A span belongs to the clip it overlaps most, unless it also overlaps another clip by more than
+    the tolerance (it crossed a separator) or overlaps no clip at all (text decoded from silence).
+    """
+    overlaps = [min(end, clip_end) - max(start, clip_start) for clip_start, clip_end in layout]
+    best = max(range(len(layout)), key=lambda index: overlaps[index])
+    if overlaps[best] <= 0:
+        # Either neighbour of the separator could own this text
+        distances = [max(clip_start - end, start - clip_end) for clip_start, clip_end in layout]
+        neighbours = {index for index, distance in enumerate(distances) if distance <= PACK_SILENCE_SECONDS}
+        return None, neighbours or {min(range(len(layout)), key=lambda index: distances[index])}
+    crossed = {index for index, overlap in enumerate(overlaps) if index != best and overlap > tolerance}
+    if crossed:
+        return None, crossed | {best}
+    return best, set()
+
+
+def split_segments(segments: Sequence[Dict], layout: Sequence[Tuple[float, float]],
+                   tolerance: float = SPLIT_TOLERANCE_SECONDS) -> Tuple[List[List[Dict]], Set[int]]:
+    """
+    Split a packed transcription's segments back into per-clip segments
+
+    Returns:
+        Tuple: Segments per clip (times relative to the clip) and the indexes of clips whose
+            split is ambiguous and that must be transcribed on their own
+    """
+    per_clip: List[List[Dict]] = [[] for _ in layout]
+    ambiguous: Set[int] = set()
+    for segment in segments:
+        if not segment.get('text', '').strip():
+            continue
+        index, unclear = _assign(segment['start'], segment['end'], layout, tolerance)
+        ambiguous |= unclear
+        if index is not None:
+            clip_start, clip_end = layout[index]
+            per_clip[index].append({
+                **segment,
+                'start': max(0.0, segment['start'] - clip_start),
+                'end': min(clip_end - clip_start, max(0.0, segment['end'] - clip_start))
+            })
+    return per_clip, ambiguous
+
+
+def split_words(words: Sequence[Dict], layout: Sequence[Tuple[float, float]],
+                tolerance: float = SPLIT_TOLERANCE_SECONDS) -> Tuple[List[str], Set[int]]:
+    """
+    Split word-timed output (Google's word time offsets) back into per-clip text
+
+    Returns:
+        Tuple: Text per clip and the indexes of clips whose split is ambiguous
+    """
+    per_clip: List[List[str]] = [[] for _ in layout]
+    ambiguous: Set[int] = set()
+    for word in words:
+        index, unclear = _assign(word['start'], word['end'], layout, tolerance)
+        ambiguous |= unclear
+        if index is not None:
+            per_clip[index].append(word['word'])
+    return [' '.join(clip_words) for clip_words in per_clip], ambiguous
+
+
+def packed_pcm(clips_pcm: Sequence[bytes], silence_seconds: float = PACK_SILENCE_SECONDS) -> Tuple[bytes, List[Tuple[float, float]]]:
+    """Concatenate 16 kHz mono PCM clips with silence between them, returning the audio and its layout."""
+    silence = b'\x00' * (int(silence_seconds * PCM_SAMPLE_RATE) * 2)
+    layout = pack_layout([len(pcm) / PCM_BYTES_PER_SECOND for pcm in clips_pcm], silence_seconds)
+    return silence.join(clips_pcm), layout
+
+
+def encode_pcm(pcm: bytes, transcode_args: List[str]) -> Iterator[bytes]:
+    """Encode 16 kHz mono PCM to MP3 with the backend's settings, in CHUNK_SIZE pieces."""
+    ffmpeg = subprocess.Popen(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 's16le', '-ar', str(PCM_SAMPLE_RATE), '-ac', '1',
+         '-i', 'pipe:0', *transcode_args, '-f', 'mp3', 'pipe:1'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0
+    )
+
+    def feed():
+        try:
+            for start in range(0, len(pcm), CHUNK_SIZE):
+                ffmpeg.stdin.write(pcm[start:start + CHUNK_SIZE])
+        except BrokenPipeError:
+            pass
+        finally:
+            try:
+                ffmpeg.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        while True:
+            chunk = ffmpeg.stdout.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        feeder.join()
+        return_code = ffmpeg.wait()
+        if return_code != 0:
+            stderr = ffmpeg.stderr.read().decode('utf-8', 'ignore')
+            raise RuntimeError(f"ffmpeg exited with code {return_code}: {stderr[:500]}")
+    finally:
+        if ffmpeg.poll() is None:
+            ffmpeg.kill()
+            ffmpeg.wait()
+        ffmpeg.stdout.close()
+        ffmpeg.stderr.close()
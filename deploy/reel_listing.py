@@ -0,0 +1,82 @@
+# Reel listing helpers used by both deploy/ and src/core/. deploy/ is uploaded to Cloud Functions on its own,
+# so this file exists twice, as deploy/reel_listing.py and src/core/reel_listing.py. It imports nothing from
+# either tree, and the two copies are kept byte-for-byte identical: change both together.
+import os
+import re
+from typing import Container, Dict, Iterable, Iterator, Optional
+
+REEL_ID_PATTERN = re.compile(r'instagram\.com/(?:[^/?#]+/)?(?:reels?|p|tv)/([A-Za-z0-9_-]+)')
+
+# New reels transcribed per in-process sync request when the caller gives no limit; the caller syncs again for the rest
+SYNC_DEFAULT_LIMIT = int(os.environ.get('SYNC_DEFAULT_LIMIT', 10))
+
+# yt-dlp options for listing a profile or collection without resolving each reel
+FLAT_LISTING_OPTIONS = {
+    'extract_flat': 'in_playlist',
+    'lazy_playlist': True,
+    'quiet': True,
+    'no_warnings': True
+}
+
+
+def reel_id_from_url(url: str) -> Optional[str]:
+    match = REEL_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def iter_entries(entries) -> Iterator[Dict]:
+    """Entries of a yt-dlp flat listing, fetching pages of a PagedList only as they are reached."""
+    if hasattr(entries, 'getslice'):
+        position = 0
+        while True:
+            try:
+                yield entries[position]
+            except IndexError:
+                return
+            position += 1
+    else:
+        yield from entries
+
+
+def listed_reels(listing: Dict) -> Iterator[Dict]:
+    """{'reel_id', 'url', 'title'} for each reel in a flat profile or collection listing."""
+    for entry in iter_entries(listing.get('entries') or []):
+        if not entry:
+            continue
+        entry_url = entry.get('url') or entry.get('webpage_url') or ''
+        reel_id = entry.get('id') or reel_id_from_url(entry_url)
+        if not reel_id:
+            continue
+        if not entry_url.startswith('http'):
+            entry_url = f"https://www.instagram.com/reel/{reel_id}/"
+        yield {
+            'reel_id': reel_id,
+            'url': entry_url,
+            'title': entry.get('title') or entry.get('description') or ''
+        }
+
+
+def pending_reels(reels: Iterable[Dict], known: Container[str], limit: Optional[int] = None,
+                  stop_after_known: Optional[int] = None) -> Iterator[Dict]:
+    """
+    The listed reels that are not known yet, in listing order (newest first for profiles).
+
+    Args:
+        reels: Listed reels, as yielded by listed_reels()
+        known: Reel IDs already processed (anything supporting `in`)
+        limit: Stop after this many new reels (no limit if None)
+        stop_after_known: Stop listing after this many consecutive known reels
+    """
+    new_count = 0
+    known_streak = 0
+    for reel in reels:
+        if reel['reel_id'] in known:
+            known_streak += 1
+            if stop_after_known and known_streak >= stop_after_known:
+                return
+            continue
+        known_streak = 0
+        if limit is not None and new_count >= limit:
+            return
+        new_count += 1
+        yield reel
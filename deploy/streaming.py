@@ -0,0 +1,230 @@
+import logging
+import os
+import resource
+import subprocess
+import threading
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+
+logger = logging.getLogger('reel_transcriber')
+
+# Every stage moves audio in pieces of this size, so memory use does not grow with clip length
+CHUNK_SIZE = 256 * 1024
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+# The resumable GCS writer buffers this much before each upload request; must be a multiple of 256 KB
+GCS_UPLOAD_CHUNK_SIZE = CHUNK_SIZE * 4
+
+# ffmpeg output settings per backend. Google's recognition config expects 44.1 kHz stereo MP3;
+# the Whisper API resamples to 16 kHz mono anyway, so sending that keeps the upload small.
+GOOGLE_TRANSCODE_ARGS = ['-ac', '2', '-ar', '44100', '-b:a', '192k']
+WHISPER_TRANSCODE_ARGS = ['-ac', '1', '-ar', '16000', '-b:a', '64k']
+
+
+class AudioSourceUnavailable(Exception):
+    """The video info has no audio format that can be fetched with a single HTTP request."""
+
+
+class MemoryLimitExceeded(Exception):
+    """A job went over its memory budget while streaming."""
+
+
+class AudioStreamError(RuntimeError):
+    """Fetching the media from the CDN or transcoding it failed, so downloading it may still work."""
+
+
+def process_rss_bytes(pid: Optional[int] = None) -> int:
+    """Current resident set size of a process (this one by default), or 0 if it cannot be read."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", 'r') as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    """High-water mark of this process's resident set size."""
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def select_audio_format(info: Dict) -> Dict:
+    """
+    Pick the format to stream from yt-dlp video info
+
+    Prefers audio-only formats, then the smallest format that carries audio. Only formats served
+    over plain HTTP(S) qualify; fragmented (HLS/DASH) formats need yt-dlp to assemble them.
+    """
+    candidates = [
+        f for f in info.get('formats') or []
+        if f.get('url') and f.get('protocol', 'https') in ('http', 'https') and f.get('acodec') != 'none'
+    ]
+    if not candidates and info.get('url') and info.get('protocol', 'https') in ('http', 'https'):
+        candidates = [info]
+    if not candidates:
+        raise AudioSourceUnavailable("No directly downloadable audio format in video info")
+
+    audio_only = [f for f in candidates if f.get('vcodec') == 'none']
+    if audio_only:
+        return max(audio_only, key=lambda f: f.get('abr') or f.get('tbr') or 0)
+    return min(candidates, key=lambda f: f.get('filesize') or f.get('filesize_approx') or f.get('tbr') or float('inf'))
+
+
+def fetch_media(media_url: str, http_headers: Dict) -> requests.Response:
+    """Open a streaming GET for a media URL, raising for HTTP errors."""
+    response = requests.get(media_url, headers=http_headers, stream=True, timeout=30)
+    response.raise_for_status()
+    return response
+
+
+class AudioTranscodeStream:
+    """
+    Download a media URL and transcode it on the fly (to MP3 unless another output_format is given)
+
+    Downloaded bytes are piped straight into ffmpeg and its output is read back in CHUNK_SIZE
+    pieces, so nothing touches disk. The memory this job owns (its ffmpeg process plus the audio it
+    holds in flight) is sampled on every chunk, and the job is aborted with MemoryLimitExceeded if it
+    goes over max_rss_bytes. The rest of the process is not charged to the job, since coalesced jobs
+    run side by side in one instance. A consumer that buffers output (the GCS resumable writer holds up
+    to GCS_UPLOAD_CHUNK_SIZE) passes that as buffered_bytes so it counts as well.
+
+    Failures of the stream itself are raised as AudioStreamError and kept in .error, so a caller can
+    tell them apart from its backend's errors even when an HTTP client wraps them. The media request is
+    opened by fetch(media_url, http_headers), a plain GET unless the caller routes it elsewhere (the
+    deployed function sends it through its Instagram session pool).
+    """
+
+    def __init__(self, media_url: str, http_headers: Optional[Dict] = None,
+                 transcode_args: Optional[List[str]] = None, max_rss_bytes: Optional[int] = None,
+                 output_format: str = 'mp3', buffered_bytes: int = 0,
+                 fetch: Optional[Callable[[str, Dict], requests.Response]] = None):
+        self.media_url = media_url
+        self.http_headers = http_headers or {}
+        self.transcode_args = transcode_args or WHISPER_TRANSCODE_ARGS
+        self.max_rss_bytes = max_rss_bytes
+        self.output_format = output_format
+        self.buffered_bytes = buffered_bytes
+        self.fetch = fetch or fetch_media
+        self.error: Optional[Exception] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.peak_job_rss = 0
+        # Bytes read from the response but not yet accepted by ffmpeg
+        self._in_flight = 0
+        self._ffmpeg: Optional[subprocess.Popen] = None
+        self._feed_error: Optional[Exception] = None
+
+    def chunks(self) -> Iterator[bytes]:
+        try:
+            response = self.fetch(self.media_url, self.http_headers)
+        except requests.RequestException as e:
+            self.error = AudioStreamError(f"Could not fetch media: {str(e)}")
+            raise self.error from e
+
+        self._ffmpeg = subprocess.Popen(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0', '-vn',
+             *self.transcode_args, '-f', self.output_format, 'pipe:1'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            bufsize=0
+        )
+        feeder = threading.Thread(target=self._feed, args=(response,), daemon=True)
+        feeder.start()
+
+        try:
+            while True:
+                chunk = self._ffmpeg.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.bytes_out += len(chunk)
+                try:
+                    self._check_memory(len(chunk))
+                except MemoryLimitExceeded as e:
+                    self.error = e
+                    raise
+                yield chunk
+
+            feeder.join()
+            return_code = self._ffmpeg.wait()
+            if self._feed_error:
+                self.error = AudioStreamError(f"Could not fetch media: {str(self._feed_error)}")
+                raise self.error from self._feed_error
+            if return_code != 0:
+                stderr = self._ffmpeg.stderr.read().decode('utf-8', 'ignore')
+                self.error = AudioStreamError(f"ffmpeg exited with code {return_code}: {stderr[:500]}")
+                raise self.error
+
+            logger.info(f"Streamed {self.bytes_in} bytes in, {self.bytes_out} bytes out, "
+                        f"peak job RSS {self.peak_job_rss // (1024 * 1024)} MB")
+        finally:
+            response.close()
+            if self._ffmpeg.poll() is None:
+                self._ffmpeg.kill()
+                self._ffmpeg.wait()
+            self._ffmpeg.stdout.close()
+            self._ffmpeg.stderr.close()
+
+    def _feed(self, response: requests.Response) -> None:
+        try:
+            for piece in response.iter_content(chunk_size=CHUNK_SIZE):
+                self.bytes_in += len(piece)
+                self._in_flight = len(piece)
+                self._ffmpeg.stdin.write(piece)
+                self._in_flight = 0
+        except BrokenPipeError:
+            # ffmpeg exited early; its return code carries the reason
+            pass
+        except Exception as e:
+            self._feed_error = e
+        finally:
+            try:
+                self._ffmpeg.stdin.close()
+            except OSError:
+                pass
+
+    def _check_memory(self, chunk_bytes: int) -> None:
+        job_rss = process_rss_bytes(self._ffmpeg.pid) + self._in_flight + chunk_bytes + self.buffered_bytes
+        self.peak_job_rss = max(self.peak_job_rss, job_rss)
+        if self.max_rss_bytes and job_rss > self.max_rss_bytes:
+            raise MemoryLimitExceeded(
+                f"Job memory {job_rss // (1024 * 1024)} MB exceeds limit of {self.max_rss_bytes // (1024 * 1024)} MB"
+            )
+
+
+def upload_stream_to_gcs(bucket, blob_name: str, chunks: Iterator[bytes]) -> None:
+    """Write chunks to a GCS object with a resumable upload that buffers at most GCS_UPLOAD_CHUNK_SIZE."""
+    blob = bucket.blob(blob_name)
+    with blob.open('wb', chunk_size=GCS_UPLOAD_CHUNK_SIZE, content_type='audio/mpeg') as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+
+def stream_to_openai_transcription(api_key: str, base_url: str, chunks: Iterator[bytes],
+                                   fields: Dict[str, str], timeout: float = 300) -> requests.Response:
+    """
+    POST audio to the OpenAI transcription endpoint as a chunked multipart body
+
+    The SDK reads file uploads fully into memory before sending, so the request body is
+    generated here instead, one chunk at a time.
+    """
+    boundary = uuid.uuid4().hex
+
+    def body() -> Iterator[bytes]:
+        for name, value in fields.items():
+            yield (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n').encode('utf-8')
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="audio.mp3"\r\n'
+               f'Content-Type: audio/mpeg\r\n\r\n').encode('utf-8')
+        yield from chunks
+        yield f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+    response = requests.post(
+        f"{base_url.rstrip('/')}/audio/transcriptions",
+        data=body(),
+        headers={
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': f'multipart/form-data; boundary={boundary}'
+        },
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return response
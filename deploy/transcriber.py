@@ -1,15 +1,19 @@
-import whisper
 import yt_dlp
 import os
 from typing import Dict, Optional
 import logging
 
+from .mmap_model import load_model
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load the Whisper model globally
-MODEL = whisper.load_model("base")
+# Converted with `python -m src.core.model_loader convert base --output deploy/models/base.mmap.pt`
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+# Load the Whisper model globally, memory-mapped when converted weights are deployed
+MODEL = load_model("base", os.environ.get('WHISPER_MODEL_PATH') or os.path.join(MODEL_DIR, 'base.mmap.pt'))
 
 class InstagramTranscriber:
     def __init__(self):
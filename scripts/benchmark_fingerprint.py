@@ -0,0 +1,80 @@
+"""
+Compare audio fingerprinting cost with transcription cost.
+
+For each audio/video file: decode to 16 kHz, time audio_fingerprint() and an index lookup,
+then time a Whisper transcription of the same audio. With --reencode, each file is also
+re-encoded at a low bitrate with the first 1.3 seconds cut, to check that the repost is
+still recognised.
+
+    python scripts/benchmark_fingerprint.py clip1.mp4 clip2.mp3 --model base --reencode
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import whisper  # noqa: E402
+
+from src.core.fingerprint import FingerprintIndex, audio_fingerprint  # noqa: E402
+
+
+def timed(function, repeat: int):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - started)
+    return result, statistics.median(durations)
+
+
+def reencoded_copy(path: str, directory: str) -> str:
+    output = os.path.join(directory, f"reencoded_{os.path.basename(path)}.mp3")
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-ss', '1.3', '-i', path, '-ac', '1', '-b:a', '48k', output],
+        check=True
+    )
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fingerprinting against transcription')
+    parser.add_argument('files', nargs='+', help='Audio or video files to benchmark')
+    parser.add_argument('--model', default='base', help='Whisper model used for the transcription timing')
+    parser.add_argument('--repeat', type=int, default=5, help='Fingerprint runs per file (median is reported)')
+    parser.add_argument('--reencode', action='store_true', help='Also check that re-encoded, trimmed copies match')
+    args = parser.parse_args()
+
+    model = whisper.load_model(args.model)
+    index = FingerprintIndex()
+
+    print(f"{'file':<32} {'audio s':>8} {'hashes':>7} {'fp ms':>8} {'lookup ms':>10} {'asr s':>8} {'fp/asr':>7}")
+    for path in args.files:
+        audio = whisper.load_audio(path)
+        fingerprint, fingerprint_seconds = timed(lambda: audio_fingerprint(audio), args.repeat)
+        _, lookup_seconds = timed(lambda: index.lookup(fingerprint), args.repeat)
+        _, transcribe_seconds = timed(lambda: model.transcribe(audio), 1)
+        index.add(fingerprint, {'text': '', 'source_url': path, 'segments': []})
+
+        print(f"{os.path.basename(path)[:32]:<32} {len(audio) / whisper.audio.SAMPLE_RATE:>8.1f} "
+              f"{len(fingerprint['hashes']):>7} {fingerprint_seconds * 1000:>8.1f} {lookup_seconds * 1000:>10.1f} "
+              f"{transcribe_seconds:>8.2f} {fingerprint_seconds / transcribe_seconds:>7.2%}")
+
+    if args.reencode:
+        print()
+        with tempfile.TemporaryDirectory() as directory:
+            for path in args.files:
+                match = index.lookup(audio_fingerprint(whisper.load_audio(reencoded_copy(path, directory))))
+                found = match['source_url'] if match else None
+                status = 'match' if found == path else ('WRONG MATCH' if found else 'NO MATCH')
+                score = f" (score {match['match_score']})" if match else ''
+                print(f"re-encoded {os.path.basename(path)}: {status}{score}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Load-test harness for the HTTP entry points.
+
+Starts fake versions of every external service, launches the chosen function locally under
+functions-framework with its endpoints pointed at the fakes, drives it at an open-loop
+request rate and reports throughput, latency percentiles, error rates and RSS over time.
+
+    python scripts/loadtest --target deploy --mode callback --rate 5 --duration 60
+    python scripts/loadtest --target src --rate 0.5 --duration 120 --latency media=200
+
+Requires functions-framework, ffmpeg and the target's own dependencies to be installed.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict
+
+from driver import LoadDriver, RssSampler
+from fakes import SERVICES, FakeServices, ServiceBehavior
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+TARGETS = {
+    'deploy': {'source': os.path.join(REPO_ROOT, 'deploy', 'main.py'), 'cwd': os.path.join(REPO_ROOT, 'deploy')},
+    'src': {'source': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src_entry.py'), 'cwd': REPO_ROOT},
+}
+
+
+def parse_service_values(values, option: str) -> Dict[str, float]:
+    parsed = {}
+    for value in values or []:
+        service, _, number = value.partition('=')
+        if service not in SERVICES or not number:
+            raise SystemExit(f"--{option} expects SERVICE=VALUE with SERVICE one of {', '.join(SERVICES)}")
+        parsed[service] = float(number)
+    return parsed
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def function_environment(fakes: FakeServices, spill_dir: str) -> Dict[str, str]:
+    base = fakes.base_url
+    return {
+        **os.environ,
+        'PYTHONUNBUFFERED': '1',
+        'INSTAGRAM_BASE_URL': base,
+        'INSTAGRAM_USERNAME': 'loadtest',
+        'INSTAGRAM_PASSWORD': 'loadtest',
+        'OPENAI_API_KEY': 'loadtest',
+        'OPENAI_BASE_URL': f"{base}/v1",
+        'SPEECH_API_ENDPOINT': base,
+        'STORAGE_EMULATOR_HOST': base,
+        'GOOGLE_CLOUD_PROJECT': 'loadtest',
+        'GCP_STORAGE_BUCKET': 'loadtest',
+        'READWISE_BASE_URL': f"{base}/api/v2",
+        'CALLBACK_SPILL_PATH': os.path.join(spill_dir, 'undelivered_callbacks.jsonl'),
+        'REEL_TRANSCRIBER_HOME': spill_dir,
+    }
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Function exited during startup with code {process.returncode}")
+        try:
+            request = urllib.request.Request(url, method='OPTIONS')
+            with urllib.request.urlopen(request, timeout=2):
+                return
+        except Exception:
+            time.sleep(0.5)
+    raise SystemExit(f"Function did not become ready within {timeout} seconds")
+
+
+def print_summary(report: Dict) -> None:
+    latency = report['latency_s']
+    print(f"\nrequests:      {report['requests']} (offered {report['offered_rate']}/s, mode {report['mode']})")
+    print(f"completed:     {report['completed']}  throughput {report['throughput_per_s']}/s")
+    print(f"error rate:    {report['error_rate']}  statuses {report['statuses']}")
+    if report['callbacks_missing'] is not None:
+        print(f"callbacks:     {report['callbacks_missing']} missing")
+    print(f"latency (s):   p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"RSS (MB):      max {report['rss_mb']['max']}  final {report['rss_mb']['final']}")
+    print(f"fake requests: {report['fake_requests']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the transcriber HTTP entry points against local fakes')
+    parser.add_argument('--target', choices=sorted(TARGETS), default='deploy', help='Which function to serve')
+    parser.add_argument('--mode', choices=['sync', 'callback'], default='sync',
+                        help='callback mode is only supported by the deploy target')
+    parser.add_argument('--rate', type=float, default=1.0, help='Requests started per second')
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds to keep sending requests')
+    parser.add_argument('--arrival', choices=['constant', 'poisson'], default='constant',
+                        help='Fixed gaps or exponentially distributed gaps between requests')
+    parser.add_argument('--reel-pool', type=int, default=0,
+                        help='Cycle through this many reel IDs (0 = every request gets a new reel)')
+    parser.add_argument('--google', action='store_true', help='Use Google Speech-to-Text instead of Whisper')
+    parser.add_argument('--clip-seconds', type=float, default=30.0, help='Length of the synthetic reel audio')
+    parser.add_argument('--latency', action='append', metavar='SERVICE=MS',
+                        help=f"Added latency per fake service ({', '.join(SERVICES)}); repeatable")
+    parser.add_argument('--jitter', action='append', metavar='SERVICE=MS', help='Latency jitter per service')
+    parser.add_argument('--error-rate', action='append', metavar='SERVICE=FRACTION',
+                        help='Fraction of requests a fake service fails (429 for instagram, 503 otherwise)')
+    parser.add_argument('--instagram-accounts', type=int, default=1,
+                        help='Fake Instagram accounts for the deploy target to spread requests over')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='functions-framework threads (passed through as --threads via GUNICORN_CMD_ARGS)')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='Seconds between RSS samples')
+    parser.add_argument('--drain-timeout', type=float, default=300.0,
+                        help='Seconds to wait for outstanding callbacks after sending stops')
+    parser.add_argument('--output', help='Write the full JSON report (including RSS samples) to this file')
+    parser.add_argument('--show-function-logs', action='store_true', help="Pass the function's output through")
+    args = parser.parse_args()
+
+    if args.mode == 'callback' and args.target != 'deploy':
+        raise SystemExit("Callback mode is only implemented by the deploy target")
+
+    latencies = parse_service_values(args.latency, 'latency')
+    jitters = parse_service_values(args.jitter, 'jitter')
+    error_rates = parse_service_values(args.error_rate, 'error-rate')
+    behaviors = {
+        service: ServiceBehavior(latencies.get(service, 0.0), jitters.get(service, 0.0), error_rates.get(service, 0.0))
+        for service in SERVICES
+    }
+
+    fakes = FakeServices(clip_seconds=args.clip_seconds, behaviors=behaviors).start()
+    print(f"Fake services listening on {fakes.base_url}")
+
+    target = TARGETS[args.target]
+    port = free_port()
+    state_dir = tempfile.mkdtemp(prefix='reel-loadtest-')
+    env = function_environment(fakes, state_dir)
+    if args.instagram_accounts > 1:
+        env['INSTAGRAM_ACCOUNTS'] = json.dumps([
+            {'username': f'loadtest{index}', 'password': 'loadtest'} for index in range(args.instagram_accounts)
+        ])
+    if args.workers:
+        env['GUNICORN_CMD_ARGS'] = f"--threads {args.workers}"
+
+    command = ['functions-framework', '--target', 'transcribe_reel', '--source', target['source'],
+               '--host', '127.0.0.1', '--port', str(port)]
+    output = None if args.show_function_logs else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=target['cwd'], env=env, stdout=output, stderr=output,
+                               start_new_session=True)
+    function_url = f"http://127.0.0.1:{port}/"
+
+    try:
+        wait_until_ready(function_url, process, timeout=300)
+        print(f"Function ({args.target}) ready on {function_url}")
+
+        sampler = RssSampler(process.pid, args.sample_interval).start()
+        driver = LoadDriver(function_url, fakes, mode=args.mode, use_whisper=not args.google,
+                            reel_pool=args.reel_pool)
+        print(f"Sending {args.rate}/s for {args.duration}s ({args.arrival} arrivals)...")
+        driver.run(args.rate, args.duration, args.arrival)
+        if args.mode == 'callback':
+            print("Waiting for callbacks...")
+            driver.wait_for_callbacks(args.drain_timeout)
+        sampler.stop()
+
+        report = driver.report(sampler.samples)
+        print_summary(report)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2)
+            print(f"\nFull report written to {args.output}")
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+        fakes.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
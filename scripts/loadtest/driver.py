@@ -0,0 +1,214 @@
+"""
+Open-loop load generation and measurement.
+
+Requests are started on a fixed schedule regardless of how many are still outstanding, so a
+slow server shows up as growing latency and errors instead of a quietly lowered request rate.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def process_tree_rss(root_pid: int) -> int:
+    """Combined RSS in bytes of a process and all of its descendants (ffmpeg, yt-dlp, ...)."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as stat:
+                # The command name may contain spaces, so split after its closing parenthesis
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+            children.setdefault(parent, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    total = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        try:
+            with open(f'/proc/{pid}/statm', 'r') as statm:
+                total += int(statm.read().split()[1]) * PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            pass
+        pending.extend(children.get(pid, []))
+    return total
+
+
+class RssSampler:
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started_at = 0.0
+
+    def start(self) -> 'RssSampler':
+        self._started_at = time.monotonic()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.samples.append({
+                't': round(time.monotonic() - self._started_at, 2),
+                'rss_mb': round(process_tree_rss(self.pid) / (1024 * 1024), 1)
+            })
+            self._stop.wait(self.interval)
+
+
+class LoadDriver:
+    """
+    Fire requests at a function at a target rate and record what happens.
+
+    In 'sync' mode latency is the HTTP round trip. In 'callback' mode every request carries a
+    unique userId and a callbackUrl pointing at the fake receiver; latency is measured from
+    sending the request to the callback arriving.
+    """
+
+    def __init__(self, function_url: str, fakes, mode: str = 'sync', use_whisper: bool = True,
+                 reel_pool: int = 0, request_timeout: float = 300, extra_body: Optional[Dict] = None):
+        self.function_url = function_url
+        self.fakes = fakes
+        self.mode = mode
+        self.use_whisper = use_whisper
+        self.reel_pool = reel_pool
+        self.request_timeout = request_timeout
+        self.extra_body = extra_body or {}
+        self.records: List[Dict] = []
+        self._records_lock = threading.Lock()
+
+    def run(self, rate: float, duration: float, arrival: str = 'constant', max_in_flight: int = 512) -> None:
+        executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='load')
+        started = time.monotonic()
+        next_send = started
+        sequence = 0
+        while next_send - started < duration:
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(self._fire, sequence)
+            sequence += 1
+            gap = 1.0 / rate
+            next_send += random.expovariate(rate) if arrival == 'poisson' else gap
+        executor.shutdown(wait=True)
+        self.send_window = time.monotonic() - started
+
+    def wait_for_callbacks(self, timeout: float) -> None:
+        user_ids = [r['user_id'] for r in self.records if r.get('accepted')]
+        self.fakes.wait_for_callbacks(user_ids, timeout)
+
+    def _fire(self, sequence: int) -> None:
+        # A small reel pool makes many requests hit the same reel, exercising request coalescing
+        reel_id = f"reel{sequence % self.reel_pool if self.reel_pool else sequence}"
+        user_id = uuid.uuid4().hex
+        body = {
+            'url': self.fakes.reel_url(reel_id),
+            'use_whisper': self.use_whisper,
+            **self.extra_body
+        }
+        if self.mode == 'callback':
+            body.update({'userId': user_id, 'callbackUrl': f"{self.fakes.base_url}/callback"})
+
+        record = {'sequence': sequence, 'user_id': user_id, 'sent_at': time.monotonic()}
+        request = urllib.request.Request(
+            self.function_url,
+            data=json.dumps(body).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.request_timeout) as response:
+                response.read()
+                record['status'] = response.status
+        except urllib.error.HTTPError as e:
+            record['status'] = e.code
+        except Exception as e:
+            record['status'] = None
+            record['error'] = type(e).__name__
+        record['responded_at'] = time.monotonic()
+        record['accepted'] = record['status'] == 200
+
+        with self._records_lock:
+            self.records.append(record)
+
+    def report(self, rss_samples: List[Dict]) -> Dict:
+        total = len(self.records)
+        ok = [r for r in self.records if r['accepted']]
+        response_latencies = [r['responded_at'] - r['sent_at'] for r in ok]
+
+        if self.mode == 'callback':
+            latencies = [
+                self.fakes.callbacks[r['user_id']] - r['sent_at']
+                for r in ok if r['user_id'] in self.fakes.callbacks
+            ]
+            completed = len(latencies)
+            finished_at = max((self.fakes.callbacks[r['user_id']] for r in ok if r['user_id'] in self.fakes.callbacks),
+                              default=None)
+        else:
+            latencies = response_latencies
+            completed = len(ok)
+            finished_at = max((r['responded_at'] for r in ok), default=None)
+
+        first_sent = min((r['sent_at'] for r in self.records), default=None)
+        elapsed = (finished_at - first_sent) if finished_at and first_sent else None
+
+        statuses: Dict[str, int] = {}
+        for r in self.records:
+            key = str(r['status'] if r['status'] is not None else r.get('error', 'error'))
+            statuses[key] = statuses.get(key, 0) + 1
+
+        def seconds(value):
+            return round(value, 3) if value is not None else None
+
+        return {
+            'mode': self.mode,
+            'requests': total,
+            'offered_rate': round(total / self.send_window, 2) if getattr(self, 'send_window', 0) else None,
+            'completed': completed,
+            'throughput_per_s': round(completed / elapsed, 2) if elapsed else None,
+            'error_rate': round(1 - completed / total, 4) if total else None,
+            'statuses': statuses,
+            'latency_s': {
+                'p50': seconds(percentile(latencies, 0.50)),
+                'p90': seconds(percentile(latencies, 0.90)),
+                'p99': seconds(percentile(latencies, 0.99)),
+                'max': seconds(max(latencies) if latencies else None)
+            },
+            'response_latency_s': {
+                'p50': seconds(percentile(response_latencies, 0.50)),
+                'p99': seconds(percentile(response_latencies, 0.99))
+            },
+            'callbacks_missing': (len(ok) - completed) if self.mode == 'callback' else None,
+            'fake_requests': dict(self.fakes.request_counts),
+            'rss_mb': {
+                'max': max((s['rss_mb'] for s in rss_samples), default=None),
+                'final': rss_samples[-1]['rss_mb'] if rss_samples else None,
+                'samples': rss_samples
+            }
+        }
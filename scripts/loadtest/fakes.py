@@ -0,0 +1,264 @@
+"""
+Local stand-ins for every external service the transcriber functions talk to.
+
+One threaded HTTP server answers for Instagram (login and reel media), the OpenAI
+transcription API, Google Speech-to-Text (REST) and Cloud Storage (JSON API), Readwise
+and the callback receiver. Each service has its own configurable latency and error rate.
+"""
+import io
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+SERVICES = ('media', 'instagram', 'openai', 'google', 'storage', 'readwise', 'callback')
+
+FAKE_TRANSCRIPT = "This is a synthetic transcript produced by the load-test fake."
+
+
+def synthetic_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """A mono 16-bit WAV with a quiet tone, standing in for reel audio."""
+    frames = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        frames += struct.pack('<h', int(3000 * math.sin(2 * math.pi * 220 * i / sample_rate)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+class ServiceBehavior:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+    def delay(self) -> None:
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+
+class FakeServices:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, clip_seconds: float = 30.0,
+                 behaviors: Optional[Dict[str, ServiceBehavior]] = None):
+        self.behaviors = {name: ServiceBehavior() for name in SERVICES}
+        self.behaviors.update(behaviors or {})
+        self.media = synthetic_wav(clip_seconds)
+        self.clip_seconds = clip_seconds
+        self.callbacks: Dict[str, float] = {}
+        self.callbacks_lock = threading.Lock()
+        self.callback_arrived = threading.Condition(self.callbacks_lock)
+        self.request_counts: Dict[str, int] = {name: 0 for name in SERVICES}
+        self.uploads: Dict[str, int] = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeServices':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reel_url(self, reel_id: str) -> str:
+        # yt-dlp's generic extractor handles direct media links, so no Instagram extractor is involved
+        return f"{self.base_url}/media/{reel_id}.wav"
+
+    def wait_for_callbacks(self, user_ids: List[str], timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        with self.callback_arrived:
+            while not all(user_id in self.callbacks for user_id in user_ids):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self.callback_arrived.wait(remaining)
+
+    def _record_callback(self, payload: Dict) -> None:
+        now = time.monotonic()
+        results = payload.get('results', [payload])
+        with self.callback_arrived:
+            for result in results:
+                if result.get('userId'):
+                    self.callbacks.setdefault(result['userId'], now)
+            self.callback_arrived.notify_all()
+
+    def _handler_class(self):
+        fakes = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PUT(self):
+                self._dispatch('PUT')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+            def do_HEAD(self):
+                self._dispatch('HEAD')
+
+            def _read_body(self) -> bytes:
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    body = bytearray()
+                    while True:
+                        size = int(self.rfile.readline().strip().split(b';')[0], 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return bytes(body)
+                        body += self.rfile.read(size)
+                        self.rfile.readline()
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b''
+
+            def _send(self, status: int, body: bytes = b'', content_type: str = 'application/json',
+                      headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def _json(self, status: int, data: Dict, headers: Optional[Dict[str, str]] = None):
+                self._send(status, json.dumps(data).encode('utf-8'), headers=headers)
+
+            def _service(self, path: str) -> str:
+                if path.startswith('/media/'):
+                    return 'media'
+                if path.startswith('/accounts/'):
+                    return 'instagram'
+                if path.startswith('/v1/audio/'):
+                    return 'openai'
+                if path.startswith('/v1/speech') or path.startswith('/v1/operations'):
+                    return 'google'
+                if path.startswith('/storage/') or path.startswith('/upload/storage/'):
+                    return 'storage'
+                if path.startswith('/api/v2/'):
+                    return 'readwise'
+                return 'callback'
+
+            def _dispatch(self, method: str):
+                parts = urlsplit(self.path)
+                service = self._service(parts.path)
+                body = self._read_body() if method in ('POST', 'PUT') else b''
+                fakes.request_counts[service] += 1
+
+                behavior = fakes.behaviors[service]
+                behavior.delay()
+                if behavior.should_fail():
+                    status = 429 if service == 'instagram' else 503
+                    self._json(status, {'error': f'injected {service} failure'})
+                    return
+
+                handler = getattr(self, f'_handle_{service}')
+                handler(method, parts.path, parse_qs(parts.query), body)
+
+            def _handle_media(self, method, path, query, body):
+                self._send(200, fakes.media, content_type='audio/wav')
+
+            def _handle_instagram(self, method, path, query, body):
+                if path.rstrip('/').endswith('/ajax'):
+                    self._json(200, {'authenticated': True, 'user': True, 'status': 'ok'},
+                               headers={'Set-Cookie': f'sessionid={uuid.uuid4().hex}; Path=/'})
+                else:
+                    self._send(200, b'<html></html>', content_type='text/html',
+                               headers={'Set-Cookie': f'csrftoken={uuid.uuid4().hex}; Path=/'})
+
+            def _handle_openai(self, method, path, query, body):
+                if b'verbose_json' in body:
+                    self._json(200, {
+                        'text': FAKE_TRANSCRIPT,
+                        'language': 'english',
+                        'duration': fakes.clip_seconds,
+                        'segments': [{
+                            'id': 0, 'seek': 0, 'start': 0.0, 'end': fakes.clip_seconds, 'text': FAKE_TRANSCRIPT,
+                            'tokens': [], 'temperature': 0.0, 'avg_logprob': -0.2,
+                            'compression_ratio': 1.2, 'no_speech_prob': 0.01
+                        }]
+                    })
+                else:
+                    self._send(200, FAKE_TRANSCRIPT.encode('utf-8'), content_type='text/plain')
+
+            def _handle_google(self, method, path, query, body):
+                self._json(200, {
+                    'name': uuid.uuid4().hex,
+                    'done': True,
+                    'response': {
+                        '@type': 'type.googleapis.com/google.cloud.speech.v1.LongRunningRecognizeResponse',
+                        'results': [{'alternatives': [{'transcript': FAKE_TRANSCRIPT, 'confidence': 0.9}]}]
+                    }
+                })
+
+            def _handle_storage(self, method, path, query, body):
+                match = re.search(r'/b/([^/]+)/o(?:/(.+))?$', path)
+                bucket = match.group(1) if match else 'bucket'
+                if method == 'DELETE':
+                    self._send(204)
+                    return
+
+                if method == 'POST' and query.get('uploadType') == ['resumable']:
+                    upload_id = uuid.uuid4().hex
+                    fakes.uploads[upload_id] = 0
+                    location = f"{fakes.base_url}/upload/storage/v1/b/{bucket}/o?uploadType=resumable&upload_id={upload_id}"
+                    self._send(200, headers={'Location': location})
+                    return
+
+                if method == 'PUT':
+                    upload_id = query.get('upload_id', [''])[0]
+                    received = fakes.uploads.get(upload_id, 0) + len(body)
+                    fakes.uploads[upload_id] = received
+                    content_range = self.headers.get('Content-Range', '')
+                    if content_range.endswith('/*'):
+                        self._send(308, headers={'Range': f'bytes=0-{received - 1}'} if received else {})
+                        return
+                    fakes.uploads.pop(upload_id, None)
+
+                self._json(200, {'bucket': bucket, 'name': 'audio/object.mp3', 'size': str(len(body))})
+
+            def _handle_readwise(self, method, path, query, body):
+                if path.rstrip('/').endswith('/auth'):
+                    self._send(204)
+                else:
+                    self._json(200, [{'id': random.randint(1, 10 ** 9), 'title': 'load test'}])
+
+            def _handle_callback(self, method, path, query, body):
+                try:
+                    fakes._record_callback(json.loads(body or b'{}'))
+                except ValueError:
+                    pass
+                self._json(200, {'ok': True})
+
+        return Handler
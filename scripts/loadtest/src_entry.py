@@ -0,0 +1,12 @@
+"""
+functions-framework source file for the src.cloud entry point.
+
+src/cloud/main.py uses package-relative imports, which functions-framework's file loader
+cannot resolve, so this shim puts the repository root on sys.path and re-exports the function.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.cloud.main import transcribe_reel  # noqa: E402,F401
@@ -5,33 +5,83 @@ import argparse
 from dotenv import load_dotenv
 from ..core.transcriber import InstagramTranscriber
 from ..core.uploader import ReadwiseUploader
+from ..core.sync import ProcessedIndex, ProfileSyncer
+from ..core.language_hints import LanguageHints
+from ..core.fingerprint import FingerprintIndex
+from ..core.presets import DEFAULT_PRESET, PRESETS
 import colorama
 from colorama import Fore, Style
 
 
+def format_timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def create_transcriber(args) -> InstagramTranscriber:
+    fingerprint_index = None
+    if args.dedup or args.dedup_index:
+        fingerprint_index = FingerprintIndex(args.dedup_index) if args.dedup_index else FingerprintIndex.default()
+    return InstagramTranscriber(LanguageHints.default(), fingerprint_index)
+
+
 def main():
     colorama.init()
 
     parser = argparse.ArgumentParser(description='Transcribe Instagram Reels and upload to Readwise')
-    parser.add_argument('url', help='Instagram Reel URL')
+    parser.add_argument('url', help='Instagram Reel URL (or profile/collection URL with --sync)')
     parser.add_argument('--no-upload', action='store_true', help='Only transcribe, do not upload to Readwise')
     parser.add_argument('--temp-dir', help='Directory for temporary files')
+    parser.add_argument('--stream', action='store_true', help='Print segments as they are transcribed')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Reuse the transcript of previously seen audio (reposts) instead of transcribing again')
+    parser.add_argument('--dedup-index', help='Fingerprint index file for --dedup (default: ~/.reel-transcriber)')
+    parser.add_argument('--language', help='Spoken language code (e.g. en); skips language detection')
+    parser.add_argument('--preset', choices=list(PRESETS), default=DEFAULT_PRESET,
+                        help='Speed/accuracy tradeoff: model size and decoding options (default: balanced)')
+    parser.add_argument('--sync', action='store_true',
+                        help='Treat the URL as a profile or saved collection and transcribe only reels not synced yet')
+    parser.add_argument('--index', help='Processed-reels index file for --sync (default: ~/.reel-transcriber)')
+    parser.add_argument('--limit', type=int, help='With --sync, transcribe at most this many new reels')
+    parser.add_argument('--stop-after-known', type=int,
+                        help='With --sync, stop listing after this many consecutive already-synced reels')
     args = parser.parse_args()
 
+    if args.sync:
+        sync(args)
+        return
+
     try:
-        transcriber = InstagramTranscriber()
+        transcriber = create_transcriber(args)
 
         print(f"\n{Fore.CYAN}Transcribing...{Style.RESET_ALL}")
-        result = transcriber.transcribe(args.url, args.temp_dir)
+        if args.stream:
+            print(f"\n{Fore.GREEN}=== Transcript ==={Style.RESET_ALL}")
+            result = None
+            for event in transcriber.stream(args.url, args.temp_dir, args.language, args.preset):
+                if event['event'] == 'segment':
+                    timestamp = f"[{format_timestamp(event['start'])} -> {format_timestamp(event['end'])}]"
+                    print(f"{Fore.CYAN}{timestamp}{Fore.LIGHTYELLOW_EX}{event['text']}{Style.RESET_ALL}", flush=True)
+                elif event['event'] == 'result':
+                    result = event['result']
+            print(f"\nSource: {result['source_url']}")
+        else:
+            result = transcriber.transcribe(args.url, args.temp_dir, args.language, args.preset)
 
-        print(f"\n{Fore.GREEN}=== Transcript ==={Style.RESET_ALL}")
-        print(f"{Fore.LIGHTYELLOW_EX}")
-        print(result['transcript'])
-        print(f"{Style.RESET_ALL}")
+            print(f"\n{Fore.GREEN}=== Transcript ==={Style.RESET_ALL}")
+            print(f"{Fore.LIGHTYELLOW_EX}")
+            print(result['transcript'])
+            print(f"{Style.RESET_ALL}")
 
         print(f"\n{Fore.GREEN}=== Metadata ==={Style.RESET_ALL}")
         print(f"Title: {result['title']}")
         print(f"Author: {result['author']}")
+        if result.get('duplicate_of'):
+            print(f"Reused transcript of: {result['duplicate_of']}")
+        if result.get('cascade'):
+            cascade = result['cascade']
+            print(f"Escalated: {cascade['escalated_segments']} of {cascade['segments']} segments "
+                  f"({cascade['escalated_seconds']:.1f}s of {cascade['audio_seconds']:.1f}s audio)")
 
         print("===============================")
 
@@ -53,5 +103,42 @@ def main():
         sys.exit(1)
 
 
+def sync(args):
+    try:
+        uploader = None
+        if not args.no_upload:
+            load_dotenv()
+            token = os.getenv('READWISE_TOKEN')
+            if not token:
+                print(f"\n{Fore.RED}Error: READWISE_TOKEN not found in environment variables{Style.RESET_ALL}")
+                sys.exit(1)
+            uploader = ReadwiseUploader(token)
+
+        index = ProcessedIndex(args.index) if args.index else ProcessedIndex.default()
+        transcriber = create_transcriber(args)
+        syncer = ProfileSyncer(transcriber, index, uploader)
+
+        print(f"\n{Fore.CYAN}Syncing {args.url} ({len(index)} reels already processed)...{Style.RESET_ALL}")
+        done = failed = 0
+        for item in syncer.sync(args.url, args.temp_dir, args.limit, args.stop_after_known, args.preset,
+                                args.language):
+            if item['status'] == 'done':
+                done += 1
+                print(f"{Fore.GREEN}Done{Style.RESET_ALL} {item['reel_id']}: {item['result']['title'][:60]}")
+            else:
+                failed += 1
+                print(f"{Fore.RED}Failed{Style.RESET_ALL} {item['reel_id']}: {item['error']}")
+
+        print(f"\n{Fore.GREEN}Sync complete: {done} new, {failed} failed{Style.RESET_ALL}")
+        cascade = transcriber.cascade_stats.summary()
+        if cascade['clips']:
+            print(f"Escalated to the larger model: {cascade['escalated_clips']} of {cascade['clips']} reels, "
+                  f"{cascade['escalated_segments']} of {cascade['segments']} segments")
+
+    except Exception as e:
+        print(f"\n{Fore.RED}Error: {str(e)}{Style.RESET_ALL}")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,87 @@
+import json
+import os
+import threading
+from typing import Dict
 import functions_framework
-from flask import jsonify
+from flask import Response, jsonify, stream_with_context
 from ..core.transcriber import InstagramTranscriber
 from ..core.uploader import ReadwiseUploader
+from ..core.reel_listing import SYNC_DEFAULT_LIMIT
+from ..core.sync import ProcessedIndex, ProfileSyncer
+from ..core.language_hints import LanguageHints
+from ..core.fingerprint import FingerprintIndex
+from ..core.presets import PRESETS
+from ..core.work_queue import JOB_DONE, JOB_FAILED, create_work_queue
+
+# Per-creator languages learned by this instance, shared across requests
+language_hints = LanguageHints()
+
+# Repost detection is enabled by pointing FINGERPRINT_INDEX at a SQLite file (or ':memory:')
+fingerprint_index = FingerprintIndex(os.environ['FINGERPRINT_INDEX']) if os.environ.get('FINGERPRINT_INDEX') else None
+
+# With QUEUE_URL set this function only enqueues; workers (python -m src.worker.main) transcribe
+work_queue = create_work_queue()
+
+# One transcriber per process: its model pool and CPU budget are what concurrent requests share
+_transcriber = None
+_transcriber_lock = threading.Lock()
+
+
+def get_transcriber() -> InstagramTranscriber:
+    global _transcriber
+    with _transcriber_lock:
+        if _transcriber is None:
+            _transcriber = InstagramTranscriber(language_hints, fingerprint_index)
+        return _transcriber
+
+
+def job_response(job: Dict) -> Dict:
+    """Public view of a queued job for status polling"""
+    response = {'jobId': job['jobId'], 'status': job['status'], 'attempts': job['attempts']}
+    if job['status'] == JOB_DONE:
+        response['result'] = job['result']
+    elif job['status'] == JOB_FAILED:
+        response['error'] = job['error']
+    return response
+
+
+def enqueue_job(url, language, preset, readwise_token) -> str:
+    """Queue one reel; the token travels as a secret that is erased when the job finishes"""
+    secrets = {'readwise_token': readwise_token} if readwise_token else None
+    return work_queue.enqueue({'url': url, 'language': language, 'preset': preset}, secrets)
+
+
+def enqueue_response(url, language, preset, readwise_token, headers):
+    job_id = enqueue_job(url, language, preset, readwise_token)
+    return jsonify({'jobId': job_id, 'status': 'queued'}), 202, headers
+
+
+def stream_response(transcriber, url, language, preset, stream_format, readwise_token, headers):
+    """
+    Build a chunked response that emits one event per transcribed segment.
+
+    'sse' sends Server-Sent Events (segment, result, error); 'ndjson' sends one JSON object per line
+    with the event name in its 'event' field.
+    """
+    def encode(event_name, data):
+        if stream_format == 'ndjson':
+            return json.dumps({'event': event_name, **data}) + '\n'
+        return f"event: {event_name}\ndata: {json.dumps(data)}\n\n"
+
+    def events():
+        try:
+            for event in transcriber.stream(url, '/tmp', language, preset):
+                event_name = event.pop('event')
+                if event_name == 'result' and readwise_token:
+                    uploader = ReadwiseUploader(readwise_token)
+                    event['result']['readwise_upload'] = uploader.upload_transcript(event['result'])
+                yield encode(event_name, event)
+        except Exception as e:
+            yield encode('error', {'error': str(e)})
+
+    mimetype = 'application/x-ndjson' if stream_format == 'ndjson' else 'text/event-stream'
+    stream_headers = {**headers, 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(events()), mimetype=mimetype, headers=stream_headers)
 
 
 @functions_framework.http
@@ -10,7 +90,7 @@ def transcribe_reel(request):
     if request.method == 'OPTIONS':
         headers = {
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'POST',
+            'Access-Control-Allow-Methods': 'GET, POST',
             'Access-Control-Allow-Headers': 'Content-Type',
             'Access-Control-Max-Age': '3600'
         }
@@ -20,7 +100,17 @@ def transcribe_reel(request):
     headers = {'Access-Control-Allow-Origin': '*'}
 
     try:
-        request_json = request.get_json()
+        # Status polling for queued jobs: GET ?jobId=... or a POST body of {"jobId": ...}
+        if request.method == 'GET':
+            request_json = {'jobId': request.args.get('jobId')}
+        else:
+            request_json = request.get_json()
+
+        if request_json and request_json.get('jobId') and 'url' not in request_json:
+            job = work_queue.status(request_json['jobId']) if work_queue else None
+            if not job:
+                return jsonify({'error': f"Unknown jobId: {request_json['jobId']}"}), 404, headers
+            return jsonify(job_response(job)), 200, headers
 
         if not request_json or 'url' not in request_json:
             return jsonify({'error': 'No URL provided'}), 400, headers
@@ -28,18 +118,61 @@ def transcribe_reel(request):
         url = request_json['url']
         upload_to_readwise = request_json.get('upload_to_readwise', False)
         readwise_token = request_json.get('readwise_token')
+        language = request_json.get('language')
+        preset = request_json.get('preset')
+        if preset is not None and preset not in PRESETS:
+            return jsonify({'error': f"Unknown preset; choose one of {', '.join(PRESETS)}"}), 400, headers
 
-        # Initialize transcriber
-        transcriber = InstagramTranscriber()
+        if upload_to_readwise and not readwise_token:
+            return jsonify({'error': 'Readwise token required for upload'}), 400, headers
 
-        # Get transcript and metadata
-        result = transcriber.transcribe(url, '/tmp')
+        # Sync mode: url is a profile or collection; the caller keeps the index and passes known IDs in
+        if request_json.get('sync'):
+            index = ProcessedIndex(reel_ids=request_json.get('known_ids', []))
+            if work_queue:
+                # Queue each new reel. Queued reels stay out of processed_ids: the caller adds each one once
+                # its job reports done, so a dead-lettered reel is listed again by the next sync
+                items = []
+                for reel in ProfileSyncer(None, index).pending(
+                        url, request_json.get('limit'), request_json.get('stop_after_known')):
+                    job_id = enqueue_job(reel['url'], language, preset, readwise_token if upload_to_readwise else None)
+                    items.append({**reel, 'status': 'queued', 'jobId': job_id})
+                return jsonify({
+                    'items': items,
+                    'processed_ids': sorted(index.reel_ids),
+                    'queued_ids': [item['reel_id'] for item in items]
+                }), 202, headers
+
+            transcriber = get_transcriber()
+            uploader = ReadwiseUploader(readwise_token) if upload_to_readwise else None
+            syncer = ProfileSyncer(transcriber, index, uploader)
+            limit = request_json.get('limit')
+            items = list(syncer.sync(
+                url, '/tmp',
+                limit=SYNC_DEFAULT_LIMIT if limit is None else limit,
+                stop_after_known=request_json.get('stop_after_known'),
+                preset=preset,
+                language=language
+            ))
+            return jsonify({'items': items, 'processed_ids': sorted(index.reel_ids)}), 200, headers
+
+        # Streaming mode: send segments as they are decoded instead of one JSON blob at the end
+        # (served in-process even with a queue, since segments go straight back on this response)
+        stream_format = request_json.get('stream')
+        if stream_format:
+            return stream_response(
+                get_transcriber(), url, language, preset, 'ndjson' if stream_format == 'ndjson' else 'sse',
+                readwise_token if upload_to_readwise else None, headers
+            )
+
+        if work_queue:
+            return enqueue_response(url, language, preset, readwise_token if upload_to_readwise else None, headers)
+
+        # Get transcript and metadata (shared transcriber: models are loaded once per instance)
+        result = get_transcriber().transcribe(url, '/tmp', language, preset)
 
         # Upload to Readwise if requested
         if upload_to_readwise:
-            if not readwise_token:
-                return jsonify({'error': 'Readwise token required for upload'}), 400, headers
-
             uploader = ReadwiseUploader(readwise_token)
             upload_result = uploader.upload_transcript(result)
             result['readwise_upload'] = upload_result
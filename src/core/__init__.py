@@ -1,4 +1,6 @@
 from .transcriber import InstagramTranscriber
 from .uploader import ReadwiseUploader
+from .sync import ProcessedIndex, ProfileSyncer
+from .language_hints import LanguageHints
 
-__all__ = ['InstagramTranscriber', 'ReadwiseUploader']
\ No newline at end of file
+__all__ = ['InstagramTranscriber', 'ReadwiseUploader', 'ProcessedIndex', 'ProfileSyncer', 'LanguageHints']
\ No newline at end of file
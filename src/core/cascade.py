@@ -0,0 +1,128 @@
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# A first-pass segment is re-decoded with the larger model when any of these gates trips. They are
+# stricter than Whisper's own fallback thresholds (-1.0 and 2.4), since the first pass is a small model
+ESCALATE_LOGPROB = -0.7
+# Repetition loops compress well; Whisper uses the same ratio to reject a decode
+ESCALATE_COMPRESSION_RATIO = 2.4
+# Text decoded where the model itself thinks there is no speech is likely made up
+ESCALATE_NO_SPEECH_PROB = 0.5
+
+# Re-decoded spans reach this far into the surrounding silence, never into a confident segment
+SPAN_PADDING_SECONDS = 0.5
+# Above this share of the clip, one whole-clip decode is cheaper than many short ones and keeps context
+WHOLE_CLIP_SHARE = 0.5
+
+
+def needs_escalation(segment: Dict) -> bool:
+    """Whether a decoded segment's confidence is too low to keep the first pass's text"""
+    if segment.get('avg_logprob', 0.0) < ESCALATE_LOGPROB:
+        return True
+    if segment.get('compression_ratio', 0.0) > ESCALATE_COMPRESSION_RATIO:
+        return True
+    return segment.get('no_speech_prob', 0.0) > ESCALATE_NO_SPEECH_PROB and bool(segment.get('text', '').strip())
+
+
+def escalation_spans(segments: Sequence[Dict], duration: float,
+                     padding: float = SPAN_PADDING_SECONDS) -> List[Tuple[int, int, float, float]]:
+    """
+    Group consecutive low-confidence segments into spans of audio to decode again
+
+    Returns:
+        List[Tuple]: (first segment index, index after the last, start seconds, end seconds) per span.
+            Spans are padded into the silence around them but stop at the neighbouring kept segments,
+            so no kept word is decoded twice.
+    """
+    spans = []
+    index = 0
+    while index < len(segments):
+        if not needs_escalation(segments[index]):
+            index += 1
+            continue
+        first = index
+        while index < len(segments) and needs_escalation(segments[index]):
+            index += 1
+        floor = segments[first - 1]['end'] if first > 0 else 0.0
+        ceiling = segments[index]['start'] if index < len(segments) else duration
+        start = max(segments[first]['start'] - padding, floor, 0.0)
+        end = min(segments[index - 1]['end'] + padding, ceiling, duration)
+        spans.append((first, index, start, max(end, start)))
+    return spans
+
+
+def shift_segments(segments: Sequence[Dict], offset: float) -> List[Dict]:
+    """Segments decoded from a slice of the clip, with times relative to the whole clip"""
+    return [
+        {**segment, 'start': segment['start'] + offset, 'end': segment['end'] + offset}
+        for segment in segments
+    ]
+
+
+def merge_segments(segments: Sequence[Dict], replacements: Sequence[Tuple[int, int, List[Dict]]]) -> List[Dict]:
+    """
+    Splice re-decoded segments into the first pass, in time order
+
+    Args:
+        segments: First-pass segments
+        replacements: (first index, index after the last, segments replacing them) per span, in order
+    """
+    merged = []
+    position = 0
+    for first, stop, replacement in replacements:
+        merged.extend(segments[position:first])
+        merged.extend(replacement)
+        position = stop
+    merged.extend(segments[position:])
+    return [{**segment, 'id': index} for index, segment in enumerate(merged)]
+
+
+def combine_stats(decodes: Sequence[Optional[Dict]]) -> Optional[Dict]:
+    """Escalation counts of one clip decoded in several windows (streaming), summed"""
+    decodes = [stats for stats in decodes if stats]
+    if not decodes:
+        return None
+    return {
+        'segments': sum(stats['segments'] for stats in decodes),
+        'escalated_segments': sum(stats['escalated_segments'] for stats in decodes),
+        'audio_seconds': round(sum(stats['audio_seconds'] for stats in decodes), 2),
+        'escalated_seconds': round(sum(stats['escalated_seconds'] for stats in decodes), 2),
+        'whole_clip': any(stats['whole_clip'] for stats in decodes)
+    }
+
+
+class CascadeStats:
+    """Running totals of how much of the cascade's work went to the larger model, per process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.escalated_clips = 0
+        self.segments = 0
+        self.escalated_segments = 0
+        self.audio_seconds = 0.0
+        self.escalated_seconds = 0.0
+
+    def record(self, clip: Optional[Dict]) -> None:
+        if not clip:
+            return
+        with self._lock:
+            self.clips += 1
+            self.escalated_clips += clip['escalated_segments'] > 0
+            self.segments += clip['segments']
+            self.escalated_segments += clip['escalated_segments']
+            self.audio_seconds += clip['audio_seconds']
+            self.escalated_seconds += clip['escalated_seconds']
+
+    def summary(self) -> Dict:
+        """Totals plus the share of clips, segments and audio that were escalated"""
+        with self._lock:
+            return {
+                'clips': self.clips,
+                'escalated_clips': self.escalated_clips,
+                'segments': self.segments,
+                'escalated_segments': self.escalated_segments,
+                'clip_share': round(self.escalated_clips / max(self.clips, 1), 3),
+                'segment_share': round(self.escalated_segments / max(self.segments, 1), 3),
+                'audio_share': round(self.escalated_seconds / max(self.audio_seconds, 1e-9), 3)
+            }
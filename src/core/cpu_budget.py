@@ -0,0 +1,235 @@
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .paths import state_dir
+
+CALIBRATION_FILE = 'cpu_budget.json'
+
+# Without calibration, give each inference a few threads; Whisper's intra-op scaling flattens out beyond that
+DEFAULT_THREADS_PER_WORKER = 4
+
+
+def available_cores() -> int:
+    """CPUs this process may actually use, honouring CPU affinity and cgroup (container) quotas"""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    try:
+        with open('/sys/fs/cgroup/cpu.max', 'r') as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != 'max':
+            cores = min(cores, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cores)
+
+
+class CpuBudget:
+    """
+    Splits the machine's cores between concurrent transcriptions
+
+    At most `workers` model calls run at once, each with `threads_per_worker` intra-op threads,
+    and at most `ffmpeg_slots` ffmpeg decodes run at once, so concurrent requests share the cores
+    instead of each trying to use all of them.
+    """
+
+    def __init__(self, workers: int, threads_per_worker: int, ffmpeg_slots: Optional[int] = None):
+        self.workers = max(1, workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.ffmpeg_slots = max(1, ffmpeg_slots or self.workers)
+        self.ffmpeg_threads = max(1, available_cores() // self.ffmpeg_slots)
+        self._inference_slots = threading.BoundedSemaphore(self.workers)
+        self._ffmpeg_slots = threading.BoundedSemaphore(self.ffmpeg_slots)
+        self._applied = False
+
+    @classmethod
+    def for_machine(cls, cores: Optional[int] = None) -> 'CpuBudget':
+        cores = cores or available_cores()
+        # Enough workers to cover every core at about DEFAULT_THREADS_PER_WORKER threads each (6 cores: 2 x 3)
+        workers = math.ceil(cores / DEFAULT_THREADS_PER_WORKER)
+        return cls(workers, max(1, cores // workers))
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'CpuBudget':
+        """The calibrated split for this machine, or a default one if calibration has not been run"""
+        path = path or os.path.join(state_dir(), CALIBRATION_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as calibration_file:
+                calibration = json.load(calibration_file)
+            # A calibration from a machine (or container limit) with a different core count does not apply
+            if calibration.get('cores') == available_cores():
+                return cls(calibration['workers'], calibration['threads_per_worker'])
+        except (OSError, ValueError, KeyError):
+            pass
+        return cls.for_machine()
+
+    def apply(self) -> None:
+        """Set torch's thread counts; call before the first model is loaded"""
+        if self._applied:
+            return
+        import torch
+        torch.set_num_threads(self.threads_per_worker)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Inter-op threads can only be set before torch starts any parallel work
+            pass
+        self._applied = True
+
+    @contextmanager
+    def inference(self):
+        with self._inference_slots:
+            yield
+
+    @contextmanager
+    def ffmpeg(self):
+        with self._ffmpeg_slots:
+            yield
+
+    def load_audio(self, path: str, sample_rate: int = 16000) -> np.ndarray:
+        """
+        Decode audio to mono float32 samples like whisper.load_audio, within the ffmpeg budget
+        """
+        command = [
+            'ffmpeg', '-nostdin', '-threads', str(self.ffmpeg_threads), '-i', path,
+            '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), '-'
+        ]
+        with self.ffmpeg():
+            try:
+                output = subprocess.run(command, capture_output=True, check=True).stdout
+            except subprocess.CalledProcessError as e:
+                raise RuntimeError(f"Failed to load audio: {e.stderr.decode('utf-8', 'ignore')}") from e
+        return np.frombuffer(output, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+_shared_budget: Optional[CpuBudget] = None
+_shared_budget_lock = threading.Lock()
+
+
+def shared_budget() -> CpuBudget:
+    """The process-wide budget; every transcriber in a process must share one"""
+    global _shared_budget
+    with _shared_budget_lock:
+        if _shared_budget is None:
+            _shared_budget = CpuBudget.load()
+        return _shared_budget
+
+
+def candidate_splits(cores: int) -> List[Dict]:
+    """One split per worker count, each giving its workers as many of the cores as divide evenly"""
+    threads_for_workers = {}
+    for threads in range(1, cores + 1):
+        # Later (larger) thread counts with the same worker count use more of the cores
+        threads_for_workers[cores // threads] = threads
+    return [
+        {'workers': workers, 'threads_per_worker': threads}
+        for workers, threads in sorted(threads_for_workers.items())
+    ]
+
+
+def measure(audio_path: str, model_name: str, workers: int, threads: int, clips: int) -> float:
+    """Clips per second when `workers` models transcribe concurrently with `threads` threads each"""
+    from .model_loader import load_model
+
+    budget = CpuBudget(workers, threads)
+    budget.apply()
+    audio = budget.load_audio(audio_path)
+    models = [load_model(model_name) for _ in range(workers)]
+
+    remaining = list(range(clips))
+    lock = threading.Lock()
+
+    def work(model):
+        while True:
+            with lock:
+                if not remaining:
+                    return
+                remaining.pop()
+            model.transcribe(audio, language='en')
+
+    # Warm up each model once so lazy initialisation is not measured
+    for model in models:
+        model.transcribe(audio[:16000], language='en')
+
+    started = time.perf_counter()
+    threads_list = [threading.Thread(target=work, args=(model,)) for model in models]
+    for thread in threads_list:
+        thread.start()
+    for thread in threads_list:
+        thread.join()
+    return clips / (time.perf_counter() - started)
+
+
+def calibrate(audio_path: str, model_name: str = 'base', clips: Optional[int] = None,
+              path: Optional[str] = None) -> Dict:
+    """
+    Try every workers-by-threads split of the available cores and store the fastest
+
+    Each split runs in a fresh interpreter, because torch's thread pools cannot be resized once used.
+    """
+    cores = available_cores()
+    results = []
+    for split in candidate_splits(cores):
+        clip_count = clips or max(4, 2 * split['workers'])
+        output = subprocess.run(
+            [sys.executable, '-m', 'src.core.cpu_budget', 'measure', audio_path, '--model', model_name,
+             '--workers', str(split['workers']), '--threads', str(split['threads_per_worker']),
+             '--clips', str(clip_count)],
+            capture_output=True, check=True, text=True
+        ).stdout
+        throughput = json.loads(output.strip().splitlines()[-1])['clips_per_second']
+        results.append({**split, 'clips_per_second': round(throughput, 3)})
+        print(f"workers={split['workers']:>2} threads={split['threads_per_worker']:>2} "
+              f"-> {throughput:.3f} clips/s", flush=True)
+
+    best = max(results, key=lambda result: result['clips_per_second'])
+    calibration = {
+        'cores': cores,
+        'model': model_name,
+        'workers': best['workers'],
+        'threads_per_worker': best['threads_per_worker'],
+        'results': results
+    }
+    path = path or os.path.join(state_dir(), CALIBRATION_FILE)
+    with open(path, 'w', encoding='utf-8') as calibration_file:
+        json.dump(calibration, calibration_file, indent=2)
+    return calibration
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate how transcriptions share CPU cores')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    calibrate_parser = subparsers.add_parser('calibrate', help='Measure every workers x threads split and save the best')
+    calibrate_parser.add_argument('audio', help='Representative audio or video file')
+    calibrate_parser.add_argument('--model', default='base', help='Whisper model to calibrate with')
+    calibrate_parser.add_argument('--clips', type=int, help='Clips per measurement (default: 2 per worker, at least 4)')
+    calibrate_parser.add_argument('--output', help='Calibration file (default: ~/.reel-transcriber/cpu_budget.json)')
+
+    measure_parser = subparsers.add_parser('measure', help=argparse.SUPPRESS)
+    measure_parser.add_argument('audio')
+    measure_parser.add_argument('--model', default='base')
+    measure_parser.add_argument('--workers', type=int, required=True)
+    measure_parser.add_argument('--threads', type=int, required=True)
+    measure_parser.add_argument('--clips', type=int, required=True)
+
+    args = parser.parse_args()
+    if args.command == 'measure':
+        throughput = measure(args.audio, args.model, args.workers, args.threads, args.clips)
+        print(json.dumps({'clips_per_second': throughput}))
+    else:
+        print(f"Calibrating on {available_cores()} cores...")
+        calibration = calibrate(args.audio, args.model, args.clips, args.output)
+        print(f"Best: {calibration['workers']} concurrent transcriptions x "
+              f"{calibration['threads_per_worker']} threads each")
+
+
+if __name__ == '__main__':
+    main()
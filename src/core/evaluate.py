@@ -0,0 +1,186 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+import numpy as np
+import requests
+from typing import Dict, List, Optional
+
+from .cascade import CascadeStats
+from .language_hints import LanguageHints
+from .paths import state_dir
+from .presets import PRESETS
+from .transcriber import SAMPLE_RATE, InstagramTranscriber
+
+DEFAULT_REFERENCES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eval_data', 'references.json')
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercase words without punctuation, so WER counts only wording differences"""
+    return re.sub(r"[^\w\s]", ' ', text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str) -> int:
+    """Word-level edit distance (substitutions + deletions + insertions)"""
+    reference_words = normalize_words(reference)
+    hypothesis_words = normalize_words(hypothesis)
+    previous = list(range(len(hypothesis_words) + 1))
+    for i, reference_word in enumerate(reference_words, 1):
+        current = [i]
+        for j, hypothesis_word in enumerate(hypothesis_words, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (reference_word != hypothesis_word)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def add_noise(audio: np.ndarray, kind: str, snr_db: float, seed: int = 0) -> np.ndarray:
+    """
+    Mix a background into a clip at the given signal-to-noise ratio, like the music or room noise under a reel
+
+    Args:
+        audio: 16 kHz mono samples
+        kind: "white" for broadband noise, "music" for a pulsing chord
+        snr_db: Speech-to-background power ratio in dB; lower is noisier
+        seed: Seed for the white noise, so repeated runs decode the same audio
+    """
+    if kind == 'white':
+        background = np.random.default_rng(seed).standard_normal(len(audio))
+    elif kind == 'music':
+        t = np.arange(len(audio)) / SAMPLE_RATE
+        chord = sum(np.sin(2 * np.pi * frequency * t) for frequency in (220.0, 277.2, 329.6, 440.0))
+        # Two beats per second, as a 120 bpm backing track would pulse
+        background = chord * (0.6 + 0.4 * np.abs(np.sin(2 * np.pi * t)))
+    else:
+        raise ValueError(f"Unknown noise kind: {kind}")
+
+    signal_power = np.mean(audio.astype(np.float64) ** 2)
+    background_power = np.mean(background ** 2)
+    if signal_power == 0 or background_power == 0:
+        return audio
+    scale = np.sqrt(signal_power / (background_power * 10 ** (snr_db / 10)))
+    return np.clip(audio + scale * background, -1.0, 1.0).astype(np.float32)
+
+
+def load_references(path: str) -> List[Dict]:
+    """
+    Read a references file: a JSON list of {"id", "audio", "text", "language"?, "noise"?, "snr_db"?}
+
+    "audio" is a URL (downloaded once into ~/.reel-transcriber/eval_audio) or a path relative to the file.
+    Entries with "noise" ("white" or "music") are decoded with that background mixed in at "snr_db", so one
+    recording can stand in for several listening conditions.
+    """
+    with open(path, 'r', encoding='utf-8') as references_file:
+        references = json.load(references_file)
+
+    cache_dir = os.path.join(state_dir(), 'eval_audio')
+    for reference in references:
+        audio = reference['audio']
+        if audio.startswith(('http://', 'https://')):
+            # Keyed by URL, so entries that reuse a recording with different noise share one download
+            url_key = hashlib.sha1(audio.encode('utf-8')).hexdigest()[:16]
+            local_path = os.path.join(cache_dir, f"{url_key}{os.path.splitext(audio)[1]}")
+            if not os.path.exists(local_path):
+                os.makedirs(cache_dir, exist_ok=True)
+                response = requests.get(audio, timeout=60)
+                response.raise_for_status()
+                with open(local_path, 'wb') as audio_file:
+                    audio_file.write(response.content)
+            reference['path'] = local_path
+        else:
+            reference['path'] = os.path.join(os.path.dirname(os.path.abspath(path)), audio)
+    return references
+
+
+def evaluate(presets: List[str], references_path: str = DEFAULT_REFERENCES,
+             transcriber: Optional[InstagramTranscriber] = None) -> List[Dict]:
+    """
+    Decode every reference clip with each preset and measure speed and accuracy
+
+    Returns:
+        List[Dict]: Per preset: real-time factor (decode time / audio duration, lower is faster)
+            and corpus word error rate; cascading presets also report the share of clips and
+            segments that were escalated to the larger model
+    """
+    transcriber = transcriber or InstagramTranscriber(LanguageHints())
+    references = load_references(references_path)
+    clips = []
+    for reference in references:
+        audio = transcriber.load_audio(reference['path'])
+        if reference.get('noise'):
+            seed = zlib.crc32(reference['id'].encode('utf-8'))
+            audio = add_noise(audio, reference['noise'], reference.get('snr_db', 10), seed)
+        clips.append((reference, audio))
+
+    results = []
+    for preset in presets:
+        # Load and warm up the preset's model so its first clip isn't charged for it
+        transcriber.decode(clips[0][1][:SAMPLE_RATE], 'en', preset=preset)
+
+        audio_seconds = decode_seconds = 0.0
+        errors = reference_words = 0
+        cascade_stats = CascadeStats()
+        for reference, audio in clips:
+            started = time.perf_counter()
+            result = transcriber.decode(audio, reference.get('language'), preset=preset)
+            decode_seconds += time.perf_counter() - started
+            audio_seconds += len(audio) / SAMPLE_RATE
+            errors += word_errors(reference['text'], result['text'])
+            reference_words += len(normalize_words(reference['text']))
+            cascade_stats.record(result.get('cascade'))
+
+        config = PRESETS[preset]
+        model = config['model']
+        if config.get('escalate_to'):
+            model = f"{model}>{PRESETS[config['escalate_to']]['model']}"
+        results.append({
+            'preset': preset,
+            'model': model,
+            'clips': len(clips),
+            'audio_seconds': round(audio_seconds, 1),
+            'decode_seconds': round(decode_seconds, 2),
+            'rtf': round(decode_seconds / audio_seconds, 3),
+            'wer': round(errors / max(reference_words, 1), 3)
+        })
+        if config.get('escalate_to'):
+            summary = cascade_stats.summary()
+            results[-1].update(
+                escalated_clips=summary['clip_share'],
+                escalated_segments=summary['segment_share'],
+                escalated_audio=summary['audio_share']
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure speed (real-time factor) and accuracy (WER) of decode presets')
+    parser.add_argument('--preset', action='append', choices=list(PRESETS),
+                        help='Preset to evaluate; repeat for several (default: all)')
+    parser.add_argument('--references', default=DEFAULT_REFERENCES,
+                        help='References JSON file (default: the bundled references)')
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = evaluate(args.preset or list(PRESETS), args.references)
+
+    print(f"{'preset':<10} {'model':<10} {'clips':>5} {'audio s':>8} {'decode s':>9} {'RTF':>6} {'WER':>6}")
+    for result in results:
+        print(f"{result['preset']:<10} {result['model']:<10} {result['clips']:>5} {result['audio_seconds']:>8.1f} "
+              f"{result['decode_seconds']:>9.2f} {result['rtf']:>6.3f} {result['wer']:>6.3f}")
+    for result in results:
+        if 'escalated_clips' in result:
+            print(f"{result['preset']}: escalated {result['escalated_clips']:.0%} of clips, "
+                  f"{result['escalated_segments']:.0%} of segments, {result['escalated_audio']:.0%} of audio")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, Optional
+
+from .paths import state_dir
+
+# Works on the 16 kHz mono audio Whisper decodes anyway, so fingerprinting needs no extra ffmpeg pass
+SAMPLE_RATE = 16000
+FRAME_SIZE = 1024
+HOP_SIZE = 512
+
+# Peak picking: a bin is a peak if it is the maximum of its neighbourhood and clearly above the clip's level
+PEAK_FREQ_RADIUS = 10
+PEAK_TIME_RADIUS = 8
+PEAK_MIN_DB_ABOVE_MEDIAN = 10.0
+MAX_PEAKS_PER_SECOND = 30
+
+# Each peak is paired with the next few peaks to form (f1, f2, dt) hashes
+FAN_OUT = 5
+MAX_PAIR_FRAMES = 63
+
+# A clip is a repost if enough hashes line up at one consistent time offset
+MIN_ALIGNED_HASHES = 20
+MIN_ALIGNED_RATIO = 0.05
+
+
+def _spectrogram(audio: np.ndarray) -> np.ndarray:
+    """Log-magnitude spectrogram as (frames, bins)"""
+    if len(audio) < FRAME_SIZE:
+        audio = np.pad(audio, (0, FRAME_SIZE - len(audio)))
+    frame_count = 1 + (len(audio) - FRAME_SIZE) // HOP_SIZE
+    frames = np.lib.stride_tricks.as_strided(
+        audio,
+        shape=(frame_count, FRAME_SIZE),
+        strides=(audio.strides[0] * HOP_SIZE, audio.strides[0])
+    )
+    magnitudes = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE).astype(np.float32), axis=1))
+    return 20 * np.log10(magnitudes + 1e-6)
+
+
+def _sliding_max(values: np.ndarray, radius: int, axis: int) -> np.ndarray:
+    """Maximum over a window of 2 * radius + 1 along one axis"""
+    result = values.copy()
+    for shift in range(1, radius + 1):
+        forward = np.full_like(values, -np.inf)
+        backward = np.full_like(values, -np.inf)
+        if axis == 0:
+            forward[:-shift] = values[shift:]
+            backward[shift:] = values[:-shift]
+        else:
+            forward[:, :-shift] = values[:, shift:]
+            backward[:, shift:] = values[:, :-shift]
+        np.maximum(result, forward, out=result)
+        np.maximum(result, backward, out=result)
+    return result
+
+
+def audio_fingerprint(audio: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Spectral-peak pair hashes of 16 kHz mono audio
+
+    Returns:
+        Dict: 'hashes' (uint32) and the frame 'offsets' (int32) at which each hash's anchor peak occurs
+    """
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    # A trimmed repost rarely starts on our frame grid. Hashing a second grid half a hop later keeps one of the
+    # two within a quarter hop of the original, so most of its peaks land in the same frames
+    fingerprints = [_peak_hashes(audio), _peak_hashes(audio[HOP_SIZE // 2:])]
+    return {key: np.concatenate([fingerprint[key] for fingerprint in fingerprints]) for key in ('hashes', 'offsets')}
+
+
+def _peak_hashes(audio: np.ndarray) -> Dict[str, np.ndarray]:
+    """Peak-pair hashes and anchor frames on one frame grid"""
+    spectrogram = _spectrogram(audio)
+    neighbourhood_max = _sliding_max(_sliding_max(spectrogram, PEAK_FREQ_RADIUS, axis=1), PEAK_TIME_RADIUS, axis=0)
+    threshold = np.median(spectrogram) + PEAK_MIN_DB_ABOVE_MEDIAN
+    times, freqs = np.nonzero((spectrogram == neighbourhood_max) & (spectrogram > threshold))
+
+    # Keep only the strongest peaks so dense audio doesn't flood the index
+    max_peaks = max(1, int(MAX_PEAKS_PER_SECOND * len(audio) / SAMPLE_RATE))
+    if len(times) > max_peaks:
+        strongest = np.argsort(spectrogram[times, freqs])[-max_peaks:]
+        times, freqs = times[strongest], freqs[strongest]
+    order = np.lexsort((freqs, times))
+    times, freqs = times[order], freqs[order]
+
+    hashes = []
+    offsets = []
+    for step in range(1, FAN_OUT + 1):
+        if len(times) <= step:
+            break
+        dt = times[step:] - times[:-step]
+        valid = (dt > 0) & (dt <= MAX_PAIR_FRAMES)
+        anchor_freqs = freqs[:-step][valid].astype(np.uint32)
+        target_freqs = freqs[step:][valid].astype(np.uint32)
+        hashes.append((anchor_freqs << 16) | (target_freqs << 6) | dt[valid].astype(np.uint32))
+        offsets.append(times[:-step][valid].astype(np.int32))
+
+    if not hashes:
+        return {'hashes': np.zeros(0, dtype=np.uint32), 'offsets': np.zeros(0, dtype=np.int32)}
+    return {'hashes': np.concatenate(hashes), 'offsets': np.concatenate(offsets)}
+
+
+class FingerprintIndex:
+    """
+    SQLite index from fingerprint hashes to previously transcribed clips
+
+    Lookup scores each candidate clip by the largest number of shared hashes that agree on one
+    time offset, which tolerates re-encoding, trimmed starts and added noise while rejecting
+    clips that merely share a few common hashes. Clips are stored with the preset that
+    transcribed them and only match lookups for the same preset.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS clips (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    hash_count INTEGER NOT NULL,
+                    transcript TEXT NOT NULL,
+                    preset TEXT
+                )
+            """)
+            # Indexes created before transcripts were kept per preset; their clips have no preset and
+            # match only lookups that give none
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(clips)")]
+            if 'preset' not in columns:
+                self._conn.execute("ALTER TABLE clips ADD COLUMN preset TEXT")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS hashes (
+                    hash INTEGER NOT NULL,
+                    clip_id INTEGER NOT NULL,
+                    offset INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS hashes_by_hash ON hashes (hash)")
+
+    @classmethod
+    def default(cls) -> 'FingerprintIndex':
+        return cls(os.path.join(state_dir(), 'fingerprints.db'))
+
+    def add(self, fingerprint: Dict[str, np.ndarray], transcript: Dict, preset: Optional[str] = None) -> None:
+        """Store a clip's fingerprint with the transcript to reuse for later matches with the same preset"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO clips (hash_count, transcript, preset) VALUES (?, ?, ?)",
+                (len(fingerprint['hashes']), json.dumps(transcript), preset)
+            )
+            clip_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO hashes (hash, clip_id, offset) VALUES (?, ?, ?)",
+                zip(fingerprint['hashes'].tolist(), [clip_id] * len(fingerprint['hashes']),
+                    fingerprint['offsets'].tolist())
+            )
+
+    def lookup(self, fingerprint: Dict[str, np.ndarray], preset: Optional[str] = None) -> Optional[Dict]:
+        """
+        Find a previously stored clip with the same audio
+
+        Args:
+            fingerprint: The clip's audio_fingerprint()
+            preset: Only clips transcribed with this preset match, so a fast transcript is never
+                returned for an accurate request
+
+        Returns:
+            Optional[Dict]: The stored transcript plus a 'match_score', or None
+        """
+        query_hashes = fingerprint['hashes']
+        if len(query_hashes) < MIN_ALIGNED_HASHES:
+            return None
+
+        unique_hashes = np.unique(query_hashes).tolist()
+        rows = []
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(unique_hashes), 900):
+                batch = unique_hashes[start:start + 900]
+                rows.extend(self._conn.execute(
+                    "SELECT hashes.hash, hashes.clip_id, hashes.offset FROM hashes "
+                    "JOIN clips ON clips.id = hashes.clip_id "
+                    f"WHERE clips.preset IS ? AND hashes.hash IN ({','.join('?' * len(batch))})",
+                    [preset] + batch
+                ).fetchall())
+        if not rows:
+            return None
+
+        matches = np.array(rows, dtype=np.int64)
+        # Pair every stored occurrence with every query occurrence of the same hash
+        query_order = np.argsort(query_hashes, kind='stable')
+        sorted_hashes = query_hashes[query_order].astype(np.int64)
+        first = np.searchsorted(sorted_hashes, matches[:, 0], side='left')
+        last = np.searchsorted(sorted_hashes, matches[:, 0], side='right')
+        repeats = last - first
+        stored = np.repeat(matches, repeats, axis=0)
+        query_positions = np.concatenate([np.arange(a, b) for a, b in zip(first, last)]) if len(first) else []
+        query_offsets = fingerprint['offsets'][query_order][query_positions].astype(np.int64)
+
+        # Votes per (clip, offset difference); the best-aligned clip wins
+        deltas = stored[:, 2] - query_offsets
+        pairs = np.stack([stored[:, 1], deltas], axis=1)
+        unique_pairs, counts = np.unique(pairs, axis=0, return_counts=True)
+        best = int(np.argmax(counts))
+        clip_id, score = int(unique_pairs[best][0]), int(counts[best])
+
+        with self._lock:
+            clip = self._conn.execute(
+                "SELECT hash_count, transcript FROM clips WHERE id = ?", (clip_id,)
+            ).fetchone()
+        ratio = score / min(len(query_hashes), clip[0])
+        if score < MIN_ALIGNED_HASHES or ratio < MIN_ALIGNED_RATIO:
+            return None
+
+        transcript = json.loads(clip[1])
+        transcript['match_score'] = round(ratio, 3)
+        return transcript
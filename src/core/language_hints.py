@@ -0,0 +1,77 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+from .paths import state_dir
+
+logger = logging.getLogger('reel_transcriber')
+
+# Whisper's own fallback threshold: decodes averaging below this log-probability are treated as failed
+LOW_CONFIDENCE_LOGPROB = -1.0
+
+# Only remember detections at least this certain
+MIN_DETECTION_PROBABILITY = 0.8
+
+
+def creator_key(info: Dict) -> Optional[str]:
+    """Stable identifier for the account that posted a video, from yt-dlp info"""
+    for field in ('channel_id', 'uploader_id', 'channel', 'uploader'):
+        if info.get(field):
+            return f"{info.get('extractor_key', 'generic').lower()}:{info[field]}"
+    return None
+
+
+def average_logprob(segments: List[Dict]) -> Optional[float]:
+    """Duration-weighted average log-probability of decoded segments"""
+    total_duration = sum(max(segment['end'] - segment['start'], 0.01) for segment in segments)
+    if not total_duration:
+        return None
+    return sum(
+        segment['avg_logprob'] * max(segment['end'] - segment['start'], 0.01) for segment in segments
+    ) / total_duration
+
+
+class LanguageHints:
+    """
+    Remembers the language each creator posts in
+
+    Creators almost always post in the same language, so a remembered language lets Whisper skip
+    its detection pass. Persisted as a JSON file when a path is given, otherwise kept in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.languages: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            # Hints are only an optimisation; a damaged file must not stop the transcriber from starting
+            try:
+                with open(path, 'r', encoding='utf-8') as hints_file:
+                    self.languages = json.load(hints_file)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read language hints from {path}: {str(e)}")
+
+    @classmethod
+    def default(cls) -> 'LanguageHints':
+        return cls(os.path.join(state_dir(), 'language_hints.json'))
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if not key:
+            return None
+        with self._lock:
+            return self.languages.get(key)
+
+    def record(self, key: Optional[str], language: Optional[str]) -> None:
+        if not key or not language:
+            return
+        with self._lock:
+            if self.languages.get(key) == language:
+                return
+            self.languages[key] = language
+            if self.path:
+                temp_path = f"{self.path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as hints_file:
+                    json.dump(self.languages, hints_file)
+                os.replace(temp_path, self.path)
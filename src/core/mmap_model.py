@@ -0,0 +1,49 @@
+# Memory-mapped Whisper loading used by both deploy/ and src/core/. deploy/ is uploaded to Cloud Functions on its own,
+# so this file exists twice, as deploy/mmap_model.py and src/core/mmap_model.py. It imports nothing from
+# either tree, and the two copies are kept byte-for-byte identical: change both together.
+import logging
+import os
+from typing import Optional
+
+import torch
+import whisper
+from whisper.model import ModelDimensions, Whisper
+
+logger = logging.getLogger(__name__)
+
+
+def load_mmap_model(path: str, name: Optional[str] = None) -> Whisper:
+    """
+    Build a Whisper model whose weights are memory-mapped from a converted checkpoint
+
+    The model is constructed as usual and the mapped tensors are then assigned in place of its
+    parameters, so the freshly initialised ones are freed straight away. Pages come from the page
+    cache and are shared by every process that maps the same file. Building on the meta device
+    instead would skip the initialisation, but on recent torch it imports torch._dynamo, which
+    costs more than it saves.
+    """
+    checkpoint = torch.load(path, mmap=True, weights_only=True, map_location='cpu')
+    model = Whisper(ModelDimensions(**checkpoint['dims']))
+    # Raises RuntimeError if the file does not cover every parameter
+    model.load_state_dict(checkpoint['model_state_dict'], assign=True)
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+    # On a GPU the weights are copied to the device once; mapping only saves the unpickling there
+    return model.to('cuda' if torch.cuda.is_available() else 'cpu').eval()
+
+
+def load_model(name: str, path: Optional[str] = None) -> Whisper:
+    """
+    Load a Whisper model, memory-mapped from path if that converted file exists, otherwise the usual way
+
+    Args:
+        name: Whisper model name
+        path: Converted checkpoint to map
+    """
+    if path and os.path.exists(path):
+        try:
+            return load_mmap_model(path, name)
+        except (RuntimeError, TypeError) as e:
+            # TypeError: torch older than 2.1 has no mmap/assign support
+            logger.warning(f"Could not memory-map {path} ({e}); loading the standard checkpoint")
+    return whisper.load_model(name)
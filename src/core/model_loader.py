@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import torch
+import whisper
+from dataclasses import asdict
+from typing import Dict, Optional
+from whisper.model import Whisper
+
+from . import mmap_model
+from .mmap_model import load_mmap_model
+from .paths import state_dir
+
+
+def converted_path(name: str) -> str:
+    return os.path.join(state_dir(), 'models', f'{name}.mmap.pt')
+
+
+def convert(name: str, output: Optional[str] = None) -> str:
+    """
+    Convert a Whisper checkpoint once into a memory-mappable file
+
+    The published checkpoints hold fp16 weights that are unpickled and copied into fp32 parameters
+    on every load. This writes the fp32 state dict in torch's zip format, whose tensor storages can
+    be mapped straight from disk by load_model().
+    """
+    output = output or converted_path(name)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    model = whisper.load_model(name, device='cpu')
+    checkpoint = {
+        'dims': asdict(model.dims),
+        'model_state_dict': {key: value.contiguous() for key, value in model.state_dict().items()}
+    }
+    temp_path = f"{output}.tmp"
+    torch.save(checkpoint, temp_path)
+    os.replace(temp_path, output)
+    return output
+
+
+def load_model(name: str = 'base', path: Optional[str] = None) -> Whisper:
+    """
+    Load a Whisper model, memory-mapped if it has been converted, otherwise the usual way
+
+    Args:
+        name: Whisper model name
+        path: Converted checkpoint to map (default: the one convert() writes for this name)
+    """
+    return mmap_model.load_model(name, path or converted_path(name))
+
+
+def _memory_kb() -> Dict[str, int]:
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as smaps:
+            for line in smaps:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        pass
+    return fields
+
+
+def measure_load(name: str, mode: str) -> Dict:
+    """Time one model load in this (fresh) process and report its memory"""
+    started = time.perf_counter()
+    if mode == 'mmap':
+        model = load_mmap_model(converted_path(name), name)
+    else:
+        model = whisper.load_model(name)
+    load_seconds = time.perf_counter() - started
+
+    # One short decode so first-use costs (page faults on mapped weights) are included
+    started = time.perf_counter()
+    model.transcribe(np.zeros(16000, dtype=np.float32), language='en', fp16=False)
+    first_decode_seconds = time.perf_counter() - started
+
+    memory = _memory_kb()
+    shared_kb = memory.get('Shared_Clean', 0) + memory.get('Shared_Dirty', 0)
+    return {
+        'mode': mode,
+        'load_seconds': round(load_seconds, 3),
+        'first_decode_seconds': round(first_decode_seconds, 3),
+        'rss_mb': round(memory.get('Rss', 0) / 1024, 1),
+        # Anonymous memory is what each process holds for itself; mapped weights count as file-backed instead
+        'anonymous_mb': round(memory.get('Anonymous', 0) / 1024, 1),
+        'file_backed_mb': round((memory.get('Rss', 0) - memory.get('Anonymous', 0)) / 1024, 1),
+        'shared_mb': round(shared_kb / 1024, 1)
+    }
+
+
+def benchmark(name: str, runs: int = 3) -> None:
+    """Compare cold starts with the pickled checkpoint and the memory-mapped conversion"""
+    if not os.path.exists(converted_path(name)):
+        print(f"Converting {name} first...")
+        convert(name)
+
+    print(f"{'mode':<8} {'load s':>8} {'1st decode s':>13} {'RSS MB':>8} {'anonymous MB':>13} {'file-backed MB':>15}")
+    for mode in ('pickle', 'mmap'):
+        for _ in range(runs):
+            # Each run is a new interpreter, as a cold-starting instance would be
+            output = subprocess.run(
+                [sys.executable, '-m', 'src.core.model_loader', 'measure', name, '--mode', mode],
+                capture_output=True, check=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['mode']:<8} {result['load_seconds']:>8.3f} {result['first_decode_seconds']:>13.3f} "
+                  f"{result['rss_mb']:>8.1f} {result['anonymous_mb']:>13.1f} {result['file_backed_mb']:>15.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert Whisper checkpoints for memory-mapped loading')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='Convert a checkpoint to the memory-mappable format')
+    convert_parser.add_argument('model', help='Whisper model name, e.g. base')
+    convert_parser.add_argument('--output', help='Output file (default: ~/.reel-transcriber/models/<model>.mmap.pt)')
+
+    benchmark_parser = subparsers.add_parser('benchmark', help='Compare cold-start time and memory before/after')
+    benchmark_parser.add_argument('model', help='Whisper model name, e.g. base')
+    benchmark_parser.add_argument('--runs', type=int, default=3, help='Fresh processes per mode')
+
+    measure_parser = subparsers.add_parser('measure', help=argparse.SUPPRESS)
+    measure_parser.add_argument('model')
+    measure_parser.add_argument('--mode', choices=['pickle', 'mmap'], required=True)
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        print(f"Wrote {convert(args.model, args.output)}")
+    elif args.command == 'benchmark':
+        benchmark(args.model, args.runs)
+    else:
+        print(json.dumps(measure_load(args.model, args.mode)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+import os
+
+
+def state_dir() -> str:
+    """
+    Directory for local state such as indexes and caches
+
+    Defaults to ~/.reel-transcriber and can be moved with the REEL_TRANSCRIBER_HOME environment variable.
+    """
+    path = os.environ.get('REEL_TRANSCRIBER_HOME') or os.path.join(os.path.expanduser('~'), '.reel-transcriber')
+    os.makedirs(path, exist_ok=True)
+    return path
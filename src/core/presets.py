@@ -0,0 +1,52 @@
+from typing import Dict, Optional
+
+DEFAULT_PRESET = 'balanced'
+
+# Model size and decoding options per preset, passed straight to whisper's transcribe()
+PRESETS = {
+    # Smallest model, greedy decoding at temperature 0 only (no fallback re-decodes), and no
+    # conditioning on previous text, which also avoids repetition loops on long clips
+    'fast': {
+        'model': 'tiny',
+        'options': {
+            'temperature': 0.0,
+            'condition_on_previous_text': False
+        }
+    },
+    # What the transcriber has always used: the base model with Whisper's default decoding
+    'balanced': {
+        'model': 'base',
+        'options': {}
+    },
+    # Larger model with beam search; Whisper's temperature fallback stays on for hard segments
+    'accurate': {
+        'model': 'small',
+        'options': {
+            'beam_size': 5,
+            'best_of': 5
+        }
+    },
+    # The fast preset's decode, then only its low-confidence segments again with the accurate preset
+    # (see cascade.py); most clips never load the larger model
+    'cascade': {
+        'model': 'tiny',
+        'options': {
+            'temperature': 0.0,
+            'condition_on_previous_text': False
+        },
+        'escalate_to': 'accurate'
+    }
+}
+
+
+def get_preset(name: Optional[str]) -> Dict:
+    """
+    Look up a decode preset by name, defaulting to DEFAULT_PRESET
+
+    Raises:
+        ValueError: If the name is not a known preset
+    """
+    name = name or DEFAULT_PRESET
+    if name not in PRESETS:
+        raise ValueError(f"Unknown preset '{name}'; choose one of {', '.join(PRESETS)}")
+    return PRESETS[name]
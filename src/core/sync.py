@@ -0,0 +1,115 @@
+import json
+import os
+import yt_dlp
+from typing import Dict, Iterable, Iterator, Optional
+
+from .paths import state_dir
+from .reel_listing import FLAT_LISTING_OPTIONS, listed_reels, pending_reels
+from .transcriber import InstagramTranscriber
+from .uploader import ReadwiseUploader
+
+
+class ProcessedIndex:
+    """
+    Set of reel IDs that have already been transcribed
+
+    Persisted as a JSON file when a path is given, otherwise kept in memory only.
+    """
+
+    def __init__(self, path: Optional[str] = None, reel_ids: Iterable[str] = ()):
+        self.path = path
+        self.reel_ids = set(reel_ids)
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as index_file:
+                self.reel_ids.update(json.load(index_file).get('reel_ids', []))
+
+    @classmethod
+    def default(cls) -> 'ProcessedIndex':
+        return cls(os.path.join(state_dir(), 'processed_reels.json'))
+
+    def __contains__(self, reel_id: str) -> bool:
+        return reel_id in self.reel_ids
+
+    def __len__(self) -> int:
+        return len(self.reel_ids)
+
+    def add(self, reel_id: str) -> None:
+        self.reel_ids.add(reel_id)
+        self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        # Write to a temporary file first so an interrupted sync never leaves a truncated index
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as index_file:
+            json.dump({'reel_ids': sorted(self.reel_ids)}, index_file)
+        os.replace(temp_path, self.path)
+
+
+class ProfileSyncer:
+    def __init__(self, transcriber: Optional[InstagramTranscriber], index: ProcessedIndex,
+                 uploader: Optional[ReadwiseUploader] = None):
+        # Only sync() transcribes; pending() needs no transcriber
+        self.transcriber = transcriber
+        self.index = index
+        self.uploader = uploader
+
+    def list_reels(self, url: str) -> Iterator[Dict]:
+        """
+        Enumerate the reels of a profile or saved collection without resolving each one
+
+        Uses yt-dlp flat extraction, so listing costs only the page requests; entries are
+        yielded as pages arrive.
+
+        Yields:
+            Dict: {'reel_id', 'url', 'title'} for each reel found
+        """
+        with yt_dlp.YoutubeDL(dict(FLAT_LISTING_OPTIONS)) as ydl:
+            listing = ydl.extract_info(url, download=False, process=False)
+            yield from listed_reels(listing)
+
+    def pending(self, url: str, limit: Optional[int] = None,
+                stop_after_known: Optional[int] = None) -> Iterator[Dict]:
+        """
+        List the reels of a profile or collection that are not in the index yet
+
+        Args:
+            url: Profile or collection URL
+            limit: Stop after this many new reels
+            stop_after_known: Stop listing after this many consecutive already-processed reels.
+                Profiles list newest first, so a small value avoids paging through the whole history.
+
+        Yields:
+            Dict: {'reel_id', 'url', 'title'} for each new reel
+        """
+        return pending_reels(self.list_reels(url), self.index, limit, stop_after_known)
+
+    def sync(self, url: str, temp_dir: Optional[str] = None, limit: Optional[int] = None,
+             stop_after_known: Optional[int] = None, preset: Optional[str] = None,
+             language: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Transcribe (and optionally upload) reels from a profile or collection that are not in the index yet
+
+        Args:
+            url: Profile or collection URL
+            temp_dir: Directory for temporary files
+            limit, stop_after_known: See pending()
+            preset: Decode preset used for every reel
+            language: Spoken language of every reel; skips language detection
+
+        Yields:
+            Dict: {'reel_id', 'url', 'status'} plus 'result' when done or 'error' when failed
+        """
+        for reel in self.pending(url, limit, stop_after_known):
+            try:
+                result = self.transcriber.transcribe(reel['url'], temp_dir, language, preset)
+                if self.uploader:
+                    result['readwise_upload'] = self.uploader.upload_transcript(result)
+            except Exception as e:
+                # Leave the reel out of the index so the next sync retries it
+                yield {**reel, 'status': 'failed', 'error': str(e)}
+                continue
+
+            self.index.add(reel['reel_id'])
+            yield {**reel, 'status': 'done', 'result': result}
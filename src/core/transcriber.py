@@ -2,42 +2,323 @@ import whisper
 import yt_dlp
 import subprocess
 import os
-from typing import Dict, Optional
+import uuid
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from .cascade import WHOLE_CLIP_SHARE, CascadeStats, combine_stats, escalation_spans, merge_segments, shift_segments
+from .cpu_budget import CpuBudget, shared_budget
+from .fingerprint import FingerprintIndex, audio_fingerprint
+from .language_hints import (
+    LOW_CONFIDENCE_LOGPROB, MIN_DETECTION_PROBABILITY, LanguageHints, average_logprob, creator_key
+)
+from .model_loader import load_model
+from .presets import DEFAULT_PRESET, get_preset
+
+# Whisper decodes in 30-second windows, so streaming emits text one window at a time
+STREAM_WINDOW_SAMPLES = whisper.audio.N_SAMPLES
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
 
 
 class InstagramTranscriber:
-    def __init__(self):
-        self.model = whisper.load_model("base")
+    def __init__(self, language_hints: Optional[LanguageHints] = None,
+                 fingerprint_index: Optional[FingerprintIndex] = None,
+                 cpu_budget: Optional[CpuBudget] = None):
+        # Concurrent transcriptions share the cores through one budget per process
+        self.cpu_budget = cpu_budget or shared_budget()
+        self.cpu_budget.apply()
+
+        # Whisper keeps per-call decoding state on the model, so each concurrent inference gets its own copy;
+        # with converted weights the copies map the same file and share its pages. Models are loaded by
+        # inference() on first use, so a preset that never decodes with base doesn't load it
+        self._idle_models: Dict[str, queue.SimpleQueue] = {}
+        self._pool_lock = threading.Lock()
+        self.language_hints = language_hints or LanguageHints()
+        # Reposted audio is recognised by fingerprint and reuses the earlier transcript when an index is given
+        self.fingerprint_index = fingerprint_index
+        # How often the cascade preset needed its larger model, across this transcriber's clips
+        self.cascade_stats = CascadeStats()
 
     def get_video_info(self, url: str) -> Dict:
         with yt_dlp.YoutubeDL() as ydl:
             return ydl.extract_info(url, download=False)
 
-    def transcribe(self, url: str, temp_dir: Optional[str] = None) -> Dict:
+    def download(self, url: str, temp_file: str) -> None:
+        subprocess.run(['yt-dlp', url, '-o', temp_file])
+
+    def build_result(self, info: Dict, url: str, text: str) -> Dict:
+        return {
+            'transcript': f"{text}\n\nSource: {url}",
+            'title': info.get('description') or info.get('title', ''),
+            'author': f"{info.get('uploader', '')} ({info.get('channel', '')})",
+            'source_url': url
+        }
+
+    @contextmanager
+    def inference(self, model_name: str = "base"):
+        """Reserve a share of the CPU budget and an instance of the named model for one inference"""
+        with self._pool_lock:
+            idle_models = self._idle_models.setdefault(model_name, queue.SimpleQueue())
+        with self.cpu_budget.inference():
+            try:
+                model = idle_models.get_nowait()
+            except queue.Empty:
+                model = load_model(model_name)
+            try:
+                yield model
+            finally:
+                idle_models.put(model)
+
+    def load_audio(self, path: str):
+        return self.cpu_budget.load_audio(path)
+
+    def detect_language(self, model, audio) -> Tuple[str, float]:
+        """Detect the spoken language from the first 30 seconds of audio"""
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=model.dims.n_mels)
+        _, probabilities = model.detect_language(mel.to(model.device))
+        language = max(probabilities, key=probabilities.get)
+        return language, probabilities[language]
+
+    def decode(self, audio, language: Optional[str] = None, creator: Optional[str] = None,
+               preset: Optional[str] = None, **options) -> Dict:
+        """
+        Run Whisper on audio without its built-in language detection pass where possible
+
+        Args:
+            audio: 16 kHz mono samples
+            language: Language given with the request; trusted as is
+            creator: Creator key whose remembered language is used when no language is given.
+                If the hinted decode comes out with low confidence, the language is detected and,
+                when it differs, the audio is decoded again.
+            preset: Decode preset (see presets.PRESETS) choosing the model and decoding options;
+                explicit options override the preset's
+        """
+        preset_config = get_preset(preset)
+        result = self._decode_with(
+            preset_config['model'], {**preset_config['options'], **options}, audio, language, creator
+        )
+        if preset_config.get('escalate_to'):
+            # Outside the first pass's inference, so the escalation doesn't hold two shares of the CPU budget
+            result = self.escalate(audio, result, preset_config['escalate_to'], **options)
+        return result
+
+    def _decode_with(self, model_name: str, options: Dict, audio, language: Optional[str],
+                     creator: Optional[str]) -> Dict:
+        with self.inference(model_name) as model:
+            if language:
+                return model.transcribe(audio, language=language, **options)
+
+            hint = self.language_hints.get(creator)
+            if hint:
+                result = model.transcribe(audio, language=hint, **options)
+                confidence = average_logprob(result['segments'])
+                if confidence is None or confidence >= LOW_CONFIDENCE_LOGPROB:
+                    return result
+
+            detected, probability = self.detect_language(model, audio)
+            if probability >= MIN_DETECTION_PROBABILITY:
+                self.language_hints.record(creator, detected)
+            if hint == detected:
+                return result
+            return model.transcribe(audio, language=detected, **options)
+
+    def escalate(self, audio, result: Dict, preset: str, **options) -> Dict:
+        """
+        Decode a first pass's low-confidence segments again with a larger preset
+
+        Each run of low-confidence segments is cut out of the audio (padded into the surrounding
+        silence), decoded in the first pass's language and spliced back with its times shifted to the
+        clip. When most of the clip is low-confidence, the whole clip is decoded again instead.
+
+        Returns:
+            Dict: The result with merged text and segments, and a 'cascade' entry counting the
+                segments and seconds that were escalated
+        """
+        escalation = get_preset(preset)
+        options = {**escalation['options'], **options}
+        duration = len(audio) / SAMPLE_RATE
+        spans = escalation_spans(result['segments'], duration)
+        stats = {
+            'segments': len(result['segments']),
+            'escalated_segments': sum(stop - first for first, stop, _, _ in spans),
+            'audio_seconds': round(duration, 2),
+            'escalated_seconds': round(sum(end - start for _, _, start, end in spans), 2),
+            'whole_clip': False
+        }
+        if not spans:
+            return {**result, 'cascade': stats}
+
+        language = result.get('language')
+        if stats['escalated_seconds'] > WHOLE_CLIP_SHARE * duration:
+            with self.inference(escalation['model']) as model:
+                redecoded = model.transcribe(audio, language=language, **options)
+            stats.update(escalated_seconds=stats['audio_seconds'], whole_clip=True)
+            return {**redecoded, 'cascade': stats}
+
+        replacements = []
+        with self.inference(escalation['model']) as model:
+            for first, stop, start, end in spans:
+                # The merged text before the span stands in for the context a full decode would have had
+                previous_text = (options.get('initial_prompt') or '') + ''.join(
+                    segment['text'] for segment in merge_segments(result['segments'][:first], replacements)
+                )
+                part = model.transcribe(
+                    audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)],
+                    language=language,
+                    **{**options, 'initial_prompt': previous_text[-200:] or None}
+                )
+                replacements.append((first, stop, shift_segments(part['segments'], start)))
+
+        segments = merge_segments(result['segments'], replacements)
+        return {
+            **result,
+            'text': ''.join(segment['text'] for segment in segments),
+            'segments': segments,
+            'cascade': stats
+        }
+
+    def find_duplicate(self, audio, preset: Optional[str] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Fingerprint audio and look it up for the preset; returns (fingerprint, stored transcript or None)"""
+        if not self.fingerprint_index:
+            return None, None
+        fingerprint = audio_fingerprint(audio)
+        return fingerprint, self.fingerprint_index.lookup(fingerprint, preset or DEFAULT_PRESET)
+
+    def remember_transcript(self, fingerprint: Optional[Dict], url: str, text: str, segments,
+                            preset: Optional[str] = None) -> None:
+        if not self.fingerprint_index or fingerprint is None:
+            return
+        self.fingerprint_index.add(fingerprint, {
+            'text': text,
+            'source_url': url,
+            'segments': [
+                {'start': round(segment['start'], 2), 'end': round(segment['end'], 2), 'text': segment['text']}
+                for segment in segments
+            ]
+        }, preset or DEFAULT_PRESET)
+
+    def transcribe(self, url: str, temp_dir: Optional[str] = None, language: Optional[str] = None,
+                   preset: Optional[str] = None) -> Dict:
         """
         Transcribe an Instagram video and return metadata
         """
+        get_preset(preset)
         info = self.get_video_info(url)
 
         # Use system temp dir if none provided
         temp_dir = temp_dir or os.path.dirname(os.path.realpath(__file__))
-        temp_file = os.path.join(temp_dir, 'temp_video.mp4')
+        temp_file = os.path.join(temp_dir, f'temp_video_{uuid.uuid4().hex}.mp4')
 
         try:
             # Download video
-            subprocess.run(['yt-dlp', url, '-o', temp_file])
+            self.download(url, temp_file)
+
+            audio = self.load_audio(temp_file)
+
+            # Reuse the transcript of a clip with the same audio, if one was seen before
+            fingerprint, duplicate = self.find_duplicate(audio, preset)
+            if duplicate:
+                result = self.build_result(info, url, duplicate['text'])
+                result['duplicate_of'] = duplicate['source_url']
+                return result
 
             # Transcribe
-            result = self.model.transcribe(temp_file)
+            result = self.decode(audio, language, creator_key(info), preset)
+            self.remember_transcript(fingerprint, url, result['text'], result['segments'], preset)
 
-            return {
-                'transcript': f"{result['text']}\n\nSource: {url}",
-                'title': info['description'],
-                'author': f"{info['uploader']} ({info['channel']})",
-                'source_url': url
-            }
+            transcript = self.build_result(info, url, result['text'])
+            if result.get('cascade'):
+                self.cascade_stats.record(result['cascade'])
+                transcript['cascade'] = result['cascade']
+            return transcript
 
         finally:
             # Cleanup
             if os.path.exists(temp_file):
                 os.remove(temp_file)
+
+    def stream(self, url: str, temp_dir: Optional[str] = None, language: Optional[str] = None,
+               preset: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Transcribe an Instagram video window by window, yielding text as soon as it is decoded
+
+        Yields:
+            Dict: {'event': 'segment', 'start', 'end', 'text'} for each decoded segment, followed by
+                a single {'event': 'result', 'result': ...} with the same fields transcribe() returns
+                plus the list of segments
+        """
+        # Presets that turn off conditioning on previous text also get no prompt from earlier windows
+        condition_on_previous_text = get_preset(preset)['options'].get('condition_on_previous_text', True)
+        info = self.get_video_info(url)
+
+        temp_dir = temp_dir or os.path.dirname(os.path.realpath(__file__))
+        temp_file = os.path.join(temp_dir, f'temp_video_{uuid.uuid4().hex}.mp4')
+
+        try:
+            self.download(url, temp_file)
+            audio = self.load_audio(temp_file)
+
+            fingerprint, duplicate = self.find_duplicate(audio, preset)
+            if duplicate:
+                for segment in duplicate['segments']:
+                    yield {'event': 'segment', **segment}
+                result = self.build_result(info, url, duplicate['text'])
+                result['segments'] = duplicate['segments']
+                result['duplicate_of'] = duplicate['source_url']
+                yield {'event': 'result', 'result': result}
+                return
+
+            segments = []
+            cascade_windows = []
+            seek = 0
+            while seek < len(audio):
+                window = audio[seek:seek + STREAM_WINDOW_SAMPLES]
+                is_last_window = seek + STREAM_WINDOW_SAMPLES >= len(audio)
+
+                # Condition on the text so far and reuse the first window's language, like a full-clip decode would
+                previous_text = ''.join(segment['text'] for segment in segments)[-200:]
+                result = self.decode(
+                    window,
+                    language,
+                    creator_key(info),
+                    preset,
+                    initial_prompt=(previous_text if condition_on_previous_text else None) or None
+                )
+                language = language or result.get('language')
+                cascade_windows.append(result.get('cascade'))
+
+                window_segments = result['segments']
+                next_seek = seek + STREAM_WINDOW_SAMPLES
+                if not is_last_window and len(window_segments) > 1:
+                    # The last segment may be cut off by the window edge; decode it again with the next window
+                    cut_segment = window_segments.pop()
+                    next_seek = max(seek + int(cut_segment['start'] * SAMPLE_RATE), seek + SAMPLE_RATE)
+
+                offset = seek / SAMPLE_RATE
+                for window_segment in window_segments:
+                    segment = {
+                        'start': round(offset + window_segment['start'], 2),
+                        'end': round(offset + window_segment['end'], 2),
+                        'text': window_segment['text']
+                    }
+                    segments.append(segment)
+                    yield {'event': 'segment', **segment}
+
+                seek = next_seek
+
+            text = ''.join(segment['text'] for segment in segments).strip()
+            self.remember_transcript(fingerprint, url, text, segments, preset)
+            result = self.build_result(info, url, text)
+            result['segments'] = segments
+            cascade = combine_stats(cascade_windows)
+            if cascade:
+                self.cascade_stats.record(cascade)
+                result['cascade'] = cascade
+            yield {'event': 'result', 'result': result}
+
+        finally:
+            # Cleanup, also when the consumer stops reading early
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
@@ -1,3 +1,4 @@
+import os
 import requests
 from datetime import datetime, timezone
 from typing import Dict
@@ -6,7 +7,7 @@ from typing import Dict
 class ReadwiseUploader:
     def __init__(self, token: str):
         self.token = token
-        self.base_url = "https://readwise.io/api/v2"
+        self.base_url = os.environ.get('READWISE_BASE_URL', 'https://readwise.io/api/v2').rstrip('/')
         self.headers = {
             "Authorization": f"Token {token}",
             "Content-Type": "application/json"
@@ -0,0 +1,309 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+DEFAULT_VISIBILITY_TIMEOUT = 600.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF = 30.0
+
+
+class WorkQueue(ABC):
+    """
+    Queue of transcription jobs shared by the HTTP function (producer) and workers (consumers)
+
+    Delivery is at least once. A received message is invisible to other workers until its
+    visibility timeout expires; a worker that dies or stops extending the timeout loses the message
+    to another worker. Failed attempts are retried with backoff, and a job that has used up
+    max_attempts is dead-lettered: it stays in the queue as failed until requeued.
+
+    Credentials a job needs (the caller's Readwise token) go in `secrets`, apart from the payload.
+    They are handed to the worker that receives the job and erased once the job is done or
+    dead-lettered; status() and dead_letters() never return them.
+
+    A networked broker implements every method (the class can't be instantiated otherwise) and
+    registers a URL scheme with register_backend().
+    """
+
+    @abstractmethod
+    def enqueue(self, payload: Dict, secrets: Optional[Dict] = None) -> str:
+        """Add a job and return its ID"""
+
+    @abstractmethod
+    def receive(self, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Dict]:
+        """
+        Take the next available job, hiding it from other workers for visibility_timeout seconds
+
+        Returns:
+            Optional[Dict]: {'jobId', 'payload', 'secrets', 'attempts', 'receipt'}, or None if nothing
+                is available
+        """
+
+    @abstractmethod
+    def extend(self, message: Dict, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+        """Keep a job hidden for longer; False if the worker no longer holds it"""
+
+    @abstractmethod
+    def complete(self, message: Dict, result: Dict) -> bool:
+        """Record a job's result; False if the worker no longer held it (another worker took over)"""
+
+    @abstractmethod
+    def fail(self, message: Dict, error: str) -> bool:
+        """
+        Record a failed attempt, scheduling a retry or dead-lettering the job
+
+        Returns:
+            bool: True if this call dead-lettered the job
+        """
+
+    @abstractmethod
+    def status(self, job_id: str) -> Optional[Dict]:
+        """{'jobId', 'status', 'attempts', 'result', 'error'} for a job, or None if unknown"""
+
+    @abstractmethod
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        """Dead-lettered jobs, oldest first"""
+
+    @abstractmethod
+    def requeue(self, job_id: str) -> bool:
+        """Give a dead-lettered job a fresh set of attempts (its secrets are gone, so it runs without them)"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue in a SQLite file, for workers on the same machine or a shared volume
+
+    Each receive claims a job inside an IMMEDIATE transaction, so concurrent workers in separate
+    processes never get the same job. Finished jobs are pruned after ttl_seconds.
+    """
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 retry_backoff: float = DEFAULT_RETRY_BACKOFF, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.ttl_seconds = ttl_seconds
+        conn = self._connect()
+        try:
+            # WAL lets status polls read while a worker holds the write lock
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    receipt TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    secrets TEXT
+                )
+            """)
+            # Queues created before secrets were kept apart from the payload
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if 'secrets' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN secrets TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_availability ON jobs (status, available_at)")
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_url(cls, url: str) -> 'SQLiteWorkQueue':
+        """sqlite:///relative/path.db or sqlite:////absolute/path.db"""
+        path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url
+        return cls(
+            path,
+            max_attempts=int(os.environ.get('QUEUE_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)),
+            retry_backoff=float(os.environ.get('QUEUE_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF))
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, so receive() can open its own IMMEDIATE transaction
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def enqueue(self, payload: Dict, secrets: Optional[Dict] = None) -> str:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM jobs WHERE status = ? AND updated_at < ?", (JOB_DONE, now - self.ttl_seconds)
+            )
+            conn.execute(
+                "INSERT INTO jobs (job_id, payload, status, available_at, created_at, updated_at, secrets) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), JOB_QUEUED, now, now, now, json.dumps(secrets) if secrets else None)
+            )
+        finally:
+            conn.close()
+        return job_id
+
+    def receive(self, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            while True:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                # Queued jobs whose retry delay has passed, and running jobs whose worker let the lease expire
+                row = conn.execute(
+                    "SELECT job_id, payload, attempts, secrets FROM jobs WHERE status IN (?, ?) AND available_at <= ? "
+                    "ORDER BY available_at LIMIT 1",
+                    (JOB_QUEUED, JOB_RUNNING, now)
+                ).fetchone()
+                if not row:
+                    conn.execute("COMMIT")
+                    return None
+
+                job_id, payload, attempts, secrets = row
+                if attempts >= self.max_attempts:
+                    # The last attempt's worker vanished without reporting; don't try again
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, receipt = NULL, secrets = NULL, updated_at = ?, "
+                        "error = 'Worker stopped responding on the final attempt' WHERE job_id = ?",
+                        (JOB_FAILED, now, job_id)
+                    )
+                    conn.execute("COMMIT")
+                    continue
+
+                receipt = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, receipt = ?, available_at = ?, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (JOB_RUNNING, receipt, now + visibility_timeout, now, job_id)
+                )
+                conn.execute("COMMIT")
+                return {
+                    'jobId': job_id,
+                    'payload': json.loads(payload),
+                    'secrets': json.loads(secrets) if secrets else {},
+                    'attempts': attempts + 1,
+                    'receipt': receipt
+                }
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _update_held(self, message: Dict, assignments: str, values: tuple) -> bool:
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ? AND receipt = ? AND status = ?",
+                values + (time.time(), message['jobId'], message['receipt'], JOB_RUNNING)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def extend(self, message: Dict, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+        return self._update_held(message, "available_at = ?", (time.time() + visibility_timeout,))
+
+    def complete(self, message: Dict, result: Dict) -> bool:
+        return self._update_held(
+            message, "status = ?, receipt = NULL, secrets = NULL, result = ?, error = NULL",
+            (JOB_DONE, json.dumps(result))
+        )
+
+    def fail(self, message: Dict, error: str) -> bool:
+        if message['attempts'] >= self.max_attempts:
+            # False if the lease expired and another worker holds the job; nothing was dead-lettered then
+            return self._update_held(
+                message, "status = ?, receipt = NULL, secrets = NULL, error = ?", (JOB_FAILED, error)
+            )
+        retry_at = time.time() + self.retry_backoff * 2 ** (message['attempts'] - 1)
+        self._update_held(
+            message, "status = ?, receipt = NULL, available_at = ?, error = ?", (JOB_QUEUED, retry_at, error)
+        )
+        return False
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT job_id, status, attempts, result, error FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return {
+            'jobId': row[0],
+            'status': row[1],
+            'attempts': row[2],
+            'result': json.loads(row[3]) if row[3] else None,
+            'error': row[4]
+        }
+
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT job_id, payload, attempts, error, updated_at FROM jobs WHERE status = ? "
+                "ORDER BY updated_at LIMIT ?",
+                (JOB_FAILED, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [
+            {
+                'jobId': row[0],
+                'url': json.loads(row[1]).get('url'),
+                'attempts': row[2],
+                'error': row[3],
+                'failedAt': row[4]
+            }
+            for row in rows
+        ]
+
+    def requeue(self, job_id: str) -> bool:
+        conn = self._connect()
+        try:
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND status = ?",
+                (JOB_QUEUED, now, now, job_id, JOB_FAILED)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+
+# URL scheme -> factory; brokers such as Redis or Pub/Sub plug in here
+QUEUE_BACKENDS: Dict[str, Callable[[str], WorkQueue]] = {
+    'sqlite': SQLiteWorkQueue.from_url
+}
+
+
+def register_backend(scheme: str, factory: Callable[[str], WorkQueue]) -> None:
+    QUEUE_BACKENDS[scheme] = factory
+
+
+def create_work_queue(url: Optional[str] = None) -> Optional[WorkQueue]:
+    """
+    The queue named by url (default: the QUEUE_URL environment variable), or None when unset
+
+    Raises:
+        ValueError: If the URL's scheme has no registered backend
+    """
+    url = url or os.environ.get('QUEUE_URL')
+    if not url:
+        return None
+    scheme = urlsplit(url).scheme or 'sqlite'
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"No work queue backend for '{scheme}://'; available: {', '.join(QUEUE_BACKENDS)}")
+    return QUEUE_BACKENDS[scheme](url)
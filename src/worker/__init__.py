@@ -0,0 +1,3 @@
+from .main import main
+
+__all__ = ['main']
\ No newline at end of file
@@ -0,0 +1,164 @@
+# src/worker/main.py
+import argparse
+import json
+import logging
+import signal
+import threading
+from typing import Dict, Optional
+
+from ..core.transcriber import InstagramTranscriber
+from ..core.uploader import ReadwiseUploader
+from ..core.language_hints import LanguageHints
+from ..core.cpu_budget import shared_budget
+from ..core.work_queue import DEFAULT_VISIBILITY_TIMEOUT, WorkQueue, create_work_queue
+
+logger = logging.getLogger('reel_transcriber.worker')
+
+
+def run_job(transcriber: InstagramTranscriber, payload: Dict, temp_dir: Optional[str] = None,
+            secrets: Optional[Dict] = None) -> Dict:
+    """Transcribe one queued reel and upload it to Readwise if the request passed a token"""
+    result = transcriber.transcribe(payload['url'], temp_dir, payload.get('language'), payload.get('preset'))
+    readwise_token = (secrets or {}).get('readwise_token')
+    if readwise_token:
+        uploader = ReadwiseUploader(readwise_token)
+        result['readwise_upload'] = uploader.upload_transcript(result)
+    return result
+
+
+class Worker:
+    """
+    Pulls jobs from a work queue and transcribes them with a shared InstagramTranscriber
+
+    Runs `concurrency` jobs at a time, extending each job's visibility timeout while it is being
+    worked on, so only jobs of crashed workers are handed to other workers.
+    """
+
+    def __init__(self, queue: WorkQueue, transcriber: InstagramTranscriber, concurrency: int = 1,
+                 visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT, poll_interval: float = 1.0,
+                 temp_dir: Optional[str] = None):
+        self.queue = queue
+        self.transcriber = transcriber
+        self.concurrency = max(1, concurrency)
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.temp_dir = temp_dir
+        self._stopping = threading.Event()
+
+    def run(self) -> None:
+        threads = [threading.Thread(target=self._loop, name=f"worker-{index}") for index in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def stop(self) -> None:
+        """Stop taking new jobs; jobs in progress are finished"""
+        self._stopping.set()
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                message = self.queue.receive(self.visibility_timeout)
+            except Exception as e:
+                logger.error(f"Could not receive from the queue: {str(e)}")
+                message = None
+            if message is None:
+                self._stopping.wait(self.poll_interval)
+                continue
+            try:
+                self.handle(message)
+            except Exception as e:
+                # e.g. the database is locked while recording the outcome; the lease runs out and the job
+                # is delivered again, so this thread keeps its place in the pool
+                logger.error(f"Could not finish job {message['jobId']}: {str(e)}", exc_info=True)
+
+    def _keep_visible(self, message: Dict, finished: threading.Event) -> None:
+        while not finished.wait(self.visibility_timeout / 3):
+            try:
+                extended = self.queue.extend(message, self.visibility_timeout)
+            except Exception as e:
+                # Try again at the next beat; the lease still has two thirds of its time left
+                logger.warning(f"Could not extend job {message['jobId']}: {str(e)}")
+                continue
+            if not extended and not finished.is_set():
+                logger.warning(f"Lost the lease on job {message['jobId']}; another worker may run it")
+                return
+
+    def handle(self, message: Dict) -> None:
+        job_id = message['jobId']
+        logger.info(f"Job {job_id} attempt {message['attempts']}: {message['payload'].get('url')}")
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._keep_visible, args=(message, finished), daemon=True)
+        heartbeat.start()
+        try:
+            try:
+                result = run_job(self.transcriber, message['payload'], self.temp_dir, message.get('secrets'))
+            except Exception as e:
+                finished.set()
+                if self.queue.fail(message, str(e)):
+                    logger.error(f"Job {job_id} dead-lettered after {message['attempts']} attempts: {str(e)}")
+                else:
+                    logger.warning(f"Job {job_id} failed, will retry: {str(e)}")
+                return
+            finished.set()
+            if not self.queue.complete(message, result):
+                logger.warning(f"Job {job_id} finished after its lease expired; result discarded")
+                return
+            logger.info(f"Job {job_id} done")
+        finally:
+            # Also when fail() or complete() raises, so the heartbeat stops extending a job nobody holds
+            finished.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcribe reels queued by the cloud function')
+    parser.add_argument('--queue', help='Queue URL, e.g. sqlite:///queue.db (default: QUEUE_URL)')
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='Process jobs until interrupted (the default)')
+    run_parser.add_argument('--concurrency', type=int,
+                            help='Jobs processed at once (default: the CPU budget\'s concurrent transcriptions)')
+    run_parser.add_argument('--visibility-timeout', type=float, default=DEFAULT_VISIBILITY_TIMEOUT,
+                            help='Seconds a job stays hidden from other workers without a heartbeat')
+    run_parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls of an empty queue')
+    run_parser.add_argument('--temp-dir', help='Directory for temporary files')
+
+    subparsers.add_parser('dead-letters', help='List jobs that used up their attempts')
+    requeue_parser = subparsers.add_parser('requeue', help='Retry a dead-lettered job')
+    requeue_parser.add_argument('job_id')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(threadName)s %(message)s')
+
+    queue = create_work_queue(args.queue)
+    if queue is None:
+        parser.error('No queue configured; pass --queue or set QUEUE_URL')
+
+    if args.command == 'dead-letters':
+        for job in queue.dead_letters():
+            print(json.dumps(job))
+        return
+    if args.command == 'requeue':
+        if not queue.requeue(args.job_id):
+            parser.exit(1, f"Job {args.job_id} is not dead-lettered\n")
+        print(f"Requeued {args.job_id} (without its Readwise token; it will not be uploaded)")
+        return
+
+    budget = shared_budget()
+    worker = Worker(
+        queue,
+        InstagramTranscriber(LanguageHints.default(), cpu_budget=budget),
+        concurrency=getattr(args, 'concurrency', None) or budget.workers,
+        visibility_timeout=getattr(args, 'visibility_timeout', DEFAULT_VISIBILITY_TIMEOUT),
+        poll_interval=getattr(args, 'poll_interval', 1.0),
+        temp_dir=getattr(args, 'temp_dir', None)
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    logger.info(f"Worker started with {worker.concurrency} concurrent jobs")
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()